@@ -0,0 +1,79 @@
+import json
+import os
+import signal
+import time
+from multiprocessing import Pool
+from queens import count_queens
+from parallel import split_queens
+
+CHECKPOINT_TASKS = 1024
+CHECKPOINT_INTERVAL = 60
+
+
+def save_checkpoint(path, state):
+    """Атомарно записує стан підрахунку: спершу в тимчасовий файл, потім замінює ним старий"""
+    temp = path + ".tmp"
+    with open(temp, "w") as f:
+        json.dump(state, f)
+    os.replace(temp, path)
+
+
+def load_checkpoint(path, n, length, width):
+    """Читає стан підрахунку і перевіряє, що він належить до тієї самої задачі"""
+    with open(path) as f:
+        state = json.load(f)
+    if (state["queens"], state["rows"], state["cols"]) != (n, length, width):
+        raise ValueError(
+            f"Файл {path} збережено для {state['queens']} ферзів на дошці {state['rows']}x{state['cols']}"
+        )
+    return state
+
+
+def prefix_count_task(task):
+    """Рахує розв'язки однієї підзадачі і повертає їх разом з її початком"""
+    n, length, width, prefix = task
+    return prefix, count_queens(n, length, width, prefix)
+
+
+def ignore_interrupt():
+    """Ctrl-C обробляє лише головний процес, робочі процеси його ігнорують"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def checkpointed_count_queens(n, length, width, path, jobs=None, resume=False,
+                              interval=CHECKPOINT_INTERVAL):
+    """Рахує розміщення n ферзів, зберігаючи прогрес у файл path не рідше ніж раз на interval секунд.
+    Перебір ділиться на підзадачі за початками розміщень, а у файл записуються завершені початки
+    з їхніми кількостями розв'язків. З resume підрахунок продовжується з файлу, пропускаючи завершені.
+    При Ctrl-C прогрес зберігається перед виходом. Без jobs підзадачі рахуються в цьому процесі"""
+    if resume:
+        state = load_checkpoint(path, n, length, width)
+    else:
+        state = {"queens": n, "rows": length, "cols": width, "tasks": CHECKPOINT_TASKS,
+                 "done": [], "count": 0}
+
+    done = {tuple(prefix) for prefix, _ in state["done"]}
+    tasks = [(n, length, width, prefix) for prefix in split_queens(n, length, width, state["tasks"])
+             if prefix not in done]
+
+    pool = None
+    if jobs:
+        pool = Pool(jobs, initializer=ignore_interrupt)
+        results = pool.imap_unordered(prefix_count_task, tasks, chunksize=1)
+    else:
+        results = map(prefix_count_task, tasks)
+    saved = time.monotonic()
+
+    try:
+        for prefix, count in results:
+            state["done"].append([list(prefix), count])
+            state["count"] += count
+            if time.monotonic() - saved >= interval:
+                save_checkpoint(path, state)
+                saved = time.monotonic()
+    finally:
+        save_checkpoint(path, state)
+        if pool:
+            pool.terminate()
+
+    return state["count"]
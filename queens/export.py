@@ -0,0 +1,129 @@
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"NQSB"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHH")
+FORMATS = ("text", "binary")
+
+
+class SolutionWriter:
+    """Потоково записує розв'язки у файл, щойно вони знайдені.
+    Текстовий формат - рядок на розв'язок зі стовпцями ферзів у кожному рядку дошки через пробіл
+    і "." для рядка без ферзя. Двійковий формат - заголовок HEADER і записи однакової довжини:
+    по байту (два байти для дошок ширше 254) на рядок дошки, стовпець + 1 або 0 для рядка без ферзя"""
+
+    def __init__(self, file_name, n, length, width, file_format="text", buffer_size=1 << 16):
+        if file_format not in FORMATS:
+            raise ValueError(f"Невідомий формат: {file_format}")
+
+        self.length = length
+        self.binary = file_format == "binary"
+        self.count = 0
+
+        if self.binary:
+            self.typecode = "B" if width < 255 else "H"
+            self.file = open(file_name, "wb", buffering=buffer_size)
+            self.file.write(HEADER.pack(MAGIC, VERSION, n, length, width))
+        else:
+            self.file = open(file_name, "w", buffering=buffer_size)
+
+    def write(self, solution):
+        """Записує розв'язок - кортеж координат ферзів (рядок, стовпець)"""
+        if self.binary:
+            record = array(self.typecode, [0]) * self.length
+            for i, j in solution:
+                record[i] = j + 1
+            if record.itemsize > 1 and sys.byteorder == "big":
+                record.byteswap()
+            self.file.write(record.tobytes())
+        else:
+            row = ["."] * self.length
+            for i, j in solution:
+                row[i] = str(j)
+            self.file.write(" ".join(row) + "\n")
+        self.count += 1
+
+    def close(self):
+        """Дописує буфер і закриває файл"""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def parse_solution(line):
+    """Розбирає рядок текстового формату в кортеж координат ферзів"""
+    return tuple((i, int(col)) for i, col in enumerate(line.split()) if col != ".")
+
+
+def iter_solutions(file_name):
+    """Потоково читає розв'язки з файлу будь-якого з форматів SolutionWriter"""
+    with open(file_name, "rb") as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+
+    if binary:
+        with SolutionFile(file_name) as solutions:
+            yield from solutions
+        return
+
+    with open(file_name) as f:
+        for line in f:
+            if line.strip():
+                yield parse_solution(line)
+
+
+class SolutionFile:
+    """Двійковий файл розв'язків, відображений у пам'ять через mmap.
+    Дозволяє дізнатися кількість розв'язків і читати будь-який з них за індексом без читання всього файлу"""
+
+    def __init__(self, file_name):
+        self.file = open(file_name, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.n, self.length, self.width = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{file_name} не є двійковим файлом розв'язків")
+        if version != VERSION:
+            raise ValueError(f"Непідтримувана версія файлу: {version}")
+
+        self.typecode = "B" if self.width < 255 else "H"
+        self.record_size = self.length * array(self.typecode).itemsize
+
+    def __len__(self):
+        if not self.record_size:
+            return 0
+        return (len(self.data) - HEADER.size) // self.record_size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Індекс розв'язку поза межами файлу")
+
+        start = HEADER.size + index * self.record_size
+        record = array(self.typecode)
+        record.frombytes(self.data[start:start + self.record_size])
+        if record.itemsize > 1 and sys.byteorder == "big":
+            record.byteswap()
+        return tuple((i, j - 1) for i, j in enumerate(record) if j)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        """Закриває відображення і файл"""
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,6 +1,10 @@
 import tkinter as tk
 from parser import create_parser
-from queens import find_all_queens, BacktrackingVisualizer
+from queens import iter_queens, iter_symmetric_queens, count_queens, dp_count_queens, auto_count_queens
+from queens import BacktrackingVisualizer
+from parallel import parallel_iter_queens, parallel_count_queens
+from export import SolutionWriter
+from checkpoint import checkpointed_count_queens
 CELL_SIZE = 50
 
 
@@ -15,18 +19,65 @@ def handle_cli_args(args):
             raise ValueError("Значення повинні бути більше 0")
         if args.queens > min(args.rows, args.cols):
             raise ValueError("Неможливо розмістити більше ферзів ніж розмір поля")
+        if args.resume and not args.checkpoint:
+            raise ValueError("Для --resume потрібно вказати файл --checkpoint")
+        if args.engine == "dp" and (args.checkpoint or args.jobs):
+            raise ValueError("Рушій dp не підтримує --checkpoint і --jobs")
     except ValueError as e:
         print(f"Помилка вводу: {str(e)}")
         return
 
-    if args.no_gui:
-
-        solutions = find_all_queens(args.queens, args.rows, args.cols)
-        print(f"Знайдено розв'язків: {len(solutions)}")
+    if args.no_gui and args.symmetry:
+        count = 0
+        classes = 0
+        writer = None
+        if args.output:
+            writer = SolutionWriter(args.output, args.queens, args.rows, args.cols, args.format)
+        for sol, orbit in iter_symmetric_queens(args.queens, args.rows, args.cols):
+            count += orbit
+            classes += 1
+            if writer:
+                writer.write(sol)
+        if writer:
+            writer.close()
+        print(f"Знайдено розв'язків: {count}")
+        print(f"З них різних з точністю до симетрії: {classes}")
+    elif args.no_gui:
+        engine = args.engine
         if args.output:
-            with open(args.output, "w") as f:
+            if args.jobs:
+                solutions = parallel_iter_queens(args.queens, args.rows, args.cols, args.jobs)
+            else:
+                solutions = iter_queens(args.queens, args.rows, args.cols)
+            with SolutionWriter(args.output, args.queens, args.rows, args.cols, args.format) as writer:
                 for sol in solutions:
-                    f.write(str(sol) + "\n")
+                    writer.write(sol)
+            count = writer.count
+        elif args.checkpoint:
+            # Прогрес і паралельний запуск є лише в переборі, тож авто-вибір не розглядає dp
+            engine = "backtracking"
+            try:
+                count = checkpointed_count_queens(
+                    args.queens, args.rows, args.cols, args.checkpoint, args.jobs, args.resume
+                )
+            except KeyboardInterrupt:
+                print(f"Перервано. Прогрес збережено у {args.checkpoint}, продовжити можна з --resume")
+                return
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Помилка файлу прогресу: {str(e)}")
+                return
+        elif args.jobs:
+            engine = "backtracking"
+            count = parallel_count_queens(args.queens, args.rows, args.cols, args.jobs)
+        elif engine == "auto":
+            count, engine = auto_count_queens(args.queens, args.rows, args.cols)
+        elif engine == "dp":
+            count = dp_count_queens(args.queens, args.rows, args.cols)
+        else:
+            count = count_queens(args.queens, args.rows, args.cols)
+        print(f"Знайдено розв'язків: {count}")
+        if not args.output:
+            print(f"Рушій підрахунку: {engine}")
     else:
         root = tk.Tk()
         app = BacktrackingVisualizer()
@@ -0,0 +1,49 @@
+from multiprocessing import Pool
+from os import cpu_count
+from queens import queen_prefixes, iter_queens, count_queens
+
+TASKS_PER_JOB = 8
+
+
+def split_queens(n, length, width, tasks):
+    """Ділить перебір на підзадачі за розміщенням ферзів у перших лініях.
+    Глибина росте, доки підзадач не стане принаймні tasks"""
+    depth = 1
+    prefixes = queen_prefixes(n, length, width, depth)
+    while len(prefixes) < tasks and depth < min(length, width):
+        depth += 1
+        prefixes = queen_prefixes(n, length, width, depth)
+    return prefixes
+
+
+def count_task(task):
+    """Рахує розв'язки однієї підзадачі"""
+    n, length, width, prefix = task
+    return count_queens(n, length, width, prefix)
+
+
+def solve_task(task):
+    """Знаходить усі розв'язки однієї підзадачі"""
+    n, length, width, prefix = task
+    return list(iter_queens(n, length, width, prefix))
+
+
+def parallel_count_queens(n, length, width, jobs=None):
+    """Рахує розміщення n ферзів на дошці length x width у jobs процесах.
+    Підзадачі роздаються по одній, щойно процес звільняється, бо їхні розміри дуже різні"""
+    jobs = jobs or cpu_count()
+    prefixes = split_queens(n, length, width, jobs * TASKS_PER_JOB)
+    tasks = [(n, length, width, prefix) for prefix in prefixes]
+    with Pool(jobs) as pool:
+        return sum(pool.imap_unordered(count_task, tasks, chunksize=1))
+
+
+def parallel_iter_queens(n, length, width, jobs=None):
+    """Перебирає розміщення n ферзів на дошці length x width у jobs процесах.
+    Розв'язки кожної підзадачі повертаються, щойно вона завершиться, тож порядок не визначений"""
+    jobs = jobs or cpu_count()
+    prefixes = split_queens(n, length, width, jobs * TASKS_PER_JOB)
+    tasks = [(n, length, width, prefix) for prefix in prefixes]
+    with Pool(jobs) as pool:
+        for solutions in pool.imap_unordered(solve_task, tasks, chunksize=1):
+            yield from solutions
@@ -23,9 +23,45 @@ def create_parser():
         "--no-gui", action="store_true", help="Запуск без графічного інтерфейсу"
     )
 
+    search_group = parser.add_argument_group("Пошук")
+    search_group.add_argument(
+        "--symmetry",
+        action="store_true",
+        help="Шукати лише розв'язки, різні з точністю до симетрій дошки (разом з --no-gui)",
+    )
+    search_group.add_argument(
+        "--engine",
+        choices=["auto", "backtracking", "dp"],
+        default="auto",
+        help="Рушій підрахунку: backtracking - перебір, dp - динамічне програмування для вузьких дошок, "
+        "auto - вибір за формою дошки",
+    )
+    search_group.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Кількість процесів для паралельного перебору (разом з --no-gui, без --symmetry)",
+    )
+    search_group.add_argument(
+        "--checkpoint",
+        type=str,
+        help="Файл, у який періодично зберігається прогрес підрахунку (разом з --no-gui, без --output)",
+    )
+    search_group.add_argument(
+        "--resume",
+        action="store_true",
+        help="Продовжити підрахунок з файлу --checkpoint",
+    )
+
     output_group = parser.add_argument_group("Експорт")
     output_group.add_argument(
         "-o", "--output", type=str, help="Шлях для збереження результатів у файл"
     )
+    output_group.add_argument(
+        "--format",
+        choices=["text", "binary"],
+        default="text",
+        help="Формат файлу результатів: text - стовпці ферзів у кожному рядку, binary - упакований двійковий",
+    )
 
     return parser
@@ -1,8 +1,13 @@
 import tkinter as tk
 import time
+from functools import lru_cache
+from operator import itemgetter
 from tkinter import messagebox
 
 CELL_SIZE = 50
+FRAME_MS = 16
+DP_MAX_WIDTH = 10
+DP_CACHE_SIZE = 1 << 16
 
 
 def generate_board(queens, length, width):
@@ -29,7 +34,300 @@ def generate_board(queens, length, width):
     return board
 
 
+def queen_lines(length, width):
+    """Повертає, чи транспонована дошка, кількість ліній та довжину лінії для бітового пошуку"""
+    transposed = width < length
+    lines, line_size = (width, length) if transposed else (length, width)
+    return transposed, lines, line_size
+
+
+def queen_prefixes(n, length, width, depth):
+    """Повертає всі допустимі початки розміщень: позиції ферзів (-1 для порожньої лінії)
+    у перших depth лініях. Початок коротший, якщо всі n ферзів вже розміщено"""
+    _, lines, line_size = queen_lines(length, width)
+    depth = min(depth, lines)
+    prefixes = []
+
+    def extend(prefix, left, cols, ld, rd):
+        line = len(prefix)
+        if left == 0 or line == depth:
+            prefixes.append(tuple(prefix))
+            return
+        for j in range(line_size):
+            bit = 1 << j
+            if not bit & (cols | ld | rd):
+                extend(prefix + [j], left - 1, cols | bit, (ld | bit) << 1, (rd | bit) >> 1)
+        if lines - line > left:
+            extend(prefix + [-1], left, cols, ld << 1, rd >> 1)
+
+    if n <= lines:
+        extend([], n, 0, 0, 0)
+    return prefixes
+
+
+def apply_prefix(prefix, n, line_size):
+    """Ставить ферзів з початку розміщення. Повертає кількість ферзів, що лишилися,
+    і маски зайнятих стовпців та діагоналей для наступної лінії, або None, якщо ферзі б'ють один одного"""
+    full = (1 << line_size) - 1
+    left, cols, ld, rd = n, 0, 0, 0
+    for j in prefix:
+        if j >= 0:
+            bit = 1 << j
+            if bit & (cols | ld | rd) or not left:
+                return None
+            cols, ld, rd, left = cols | bit, ld | bit, rd | bit, left - 1
+        ld = ld << 1 & full
+        rd >>= 1
+    return left, cols, ld, rd
+
+
+def search_lines(n, lines, line_size, first_half=False, prefix=()):
+    """Перебирає розміщення n ферзів по лініях за допомогою бітових масок.
+    Повертає кортежі пар (лінія, позиція).
+    З first_half перший ферзь стоїть у лівій половині лінії, а остання зайнята лінія
+    не далі від кінця, ніж перша від початку - решту розміщень дають симетрії дошки.
+    З prefix перебираються лише розміщення з цим початком (див. queen_prefixes)"""
+    if n > lines:
+        return
+
+    start = len(prefix)
+    state = apply_prefix(prefix, n, line_size)
+    if state is None:
+        return
+    k, c, l, r = state
+    if k == 0:
+        yield tuple((i, j) for i, j in enumerate(prefix) if j >= 0)
+        return
+    if lines - start < k:
+        return
+
+    full = (1 << line_size) - 1
+    skip = 1 << line_size
+
+    cols = [0] * lines
+    ld = [0] * lines
+    rd = [0] * lines
+    left = [0] * lines
+    free = [0] * lines
+    queen = list(prefix) + [-1] * (lines - start)
+
+    first = (1 << (line_size + 1) // 2) - 1 if first_half else full
+    end = lines
+
+    def can_skip(line, k):
+        if k == n and first_half:
+            return lines - 2 * line - 2 >= n
+        return end - line > k
+
+    line = start
+    cols[line], ld[line], rd[line], left[line] = c, l, r, k
+    free[line] = (full if k < n else first) & ~(c | l | r) | (skip if can_skip(line, k) else 0)
+
+    while line >= start:
+        options = free[line]
+        if not options:
+            line -= 1
+            continue
+
+        bit = options & -options
+        free[line] = options ^ bit
+        c, l, r, k = cols[line], ld[line], rd[line], left[line]
+
+        if bit == skip:
+            queen[line] = -1
+        else:
+            queen[line] = bit.bit_length() - 1
+            c |= bit
+            l |= bit
+            r |= bit
+            if k == n and first_half:
+                end = lines - line
+            k -= 1
+
+        if k == 0:
+            yield tuple((i, j) for i, j in enumerate(queen[:line + 1]) if j >= 0)
+            continue
+
+        line += 1
+        l = l << 1 & full
+        r >>= 1
+        cols[line], ld[line], rd[line], left[line] = c, l, r, k
+        free[line] = (full if k < n else first) & ~(c | l | r) | (skip if can_skip(line, k) else 0)
+
+
+def iter_queens(n, length, width, prefix=()):
+    """Ліниво перебирає всі розміщення n ферзів на дошці length x width (з початком prefix, якщо задано).
+    Кожен розв'язок - кортеж координат ферзів (рядок, стовпець), упорядкованих за рядками"""
+    transposed, lines, line_size = queen_lines(length, width)
+    if not transposed:
+        yield from search_lines(n, lines, line_size, prefix=prefix)
+        return
+
+    for solution in search_lines(n, lines, line_size, prefix=prefix):
+        yield tuple(sorted((j, i) for i, j in solution))
+
+
+def symmetric_images(solution, length, width):
+    """Повертає образи розв'язку при всіх симетріях дошки: 8 для квадратної, 4 для прямокутної.
+    Розв'язок має бути впорядкований за рядками, як і кожен з образів"""
+    back = solution[::-1]
+    images = [solution,
+              tuple((i, width - 1 - j) for i, j in solution),
+              tuple((length - 1 - i, j) for i, j in back),
+              tuple((length - 1 - i, width - 1 - j) for i, j in back)]
+    if length == width:
+        images += [tuple(sorted((j, i) for i, j in image)) for image in images]
+    return images
+
+
+def image_heads(solution, length, width):
+    """Повертає перші клітинки образів розв'язку при всіх симетріях дошки, крім тотожної"""
+    i, j = solution[-1]
+    heads = [(solution[0][0], width - 1 - solution[0][1]), (length - 1 - i, j), (length - 1 - i, width - 1 - j)]
+    if length == width:
+        low_row, low = min(solution, key=itemgetter(1))
+        high_row, high = max(solution, key=itemgetter(1))
+        heads += [(low, low_row), (width - 1 - high, high_row),
+                  (low, length - 1 - low_row), (width - 1 - high, length - 1 - high_row)]
+    return heads
+
+
+def iter_symmetric_queens(n, length, width):
+    """Ліниво перебирає лише канонічні розв'язки - найменші серед своїх симетричних образів.
+    Повертає пари (розв'язок, розмір орбіти), де розмір орбіти - кількість різних образів розв'язку"""
+    transposed, lines, line_size = queen_lines(length, width)
+    square = lines == line_size
+    for solution in search_lines(n, lines, line_size, first_half=True):
+        if not solution:
+            yield solution, 1
+            continue
+
+        head = solution[0]
+        heads = image_heads(solution, lines, line_size)
+        if min(heads) < head:
+            continue
+
+        if head in heads:
+            images = symmetric_images(solution, lines, line_size)
+            if solution != min(images):
+                continue
+            orbit = len(set(images))
+        else:
+            orbit = 8 if square else 4
+
+        if transposed:
+            solution = tuple(sorted((j, i) for i, j in solution))
+        yield solution, orbit
+
+
+def expand_queens(solution, length, width):
+    """Ліниво перебирає всі різні розв'язки, симетричні даному (разом із ним самим)"""
+    seen = set()
+    for image in symmetric_images(solution, length, width):
+        if image not in seen:
+            seen.add(image)
+            yield image
+
+
+def count_queens(n, length, width, prefix=()):
+    """Рахує розміщення n ферзів на дошці length x width (з початком prefix, якщо задано),
+    не створюючи самих розв'язків"""
+    _, lines, line_size = queen_lines(length, width)
+    if n > lines:
+        return 0
+
+    start = len(prefix)
+    state = apply_prefix(prefix, n, line_size)
+    if state is None:
+        return 0
+    left, cols, ld, rd = state
+    if left == 0:
+        return 1
+    if lines - start < left:
+        return 0
+
+    full = (1 << line_size) - 1
+
+    def count(line, left, cols, ld, rd):
+        free = full & ~(cols | ld | rd)
+        if left == 1:
+            total = free.bit_count()
+        else:
+            total = 0
+            while free:
+                bit = free & -free
+                free ^= bit
+                total += count(line + 1, left - 1, cols | bit, (ld | bit) << 1 & full, (rd | bit) >> 1)
+
+        if lines - line > left:
+            total += count(line + 1, left, cols, ld << 1 & full, rd >> 1)
+        return total
+
+    return count(start, left, cols, ld, rd)
+
+
+def dp_count_queens(n, length, width, cache_size=DP_CACHE_SIZE):
+    """Рахує розміщення n ферзів динамічним програмуванням по лініях довшої сторони дошки.
+    Стан після лінії - маски зайнятих стовпців і діагоналей у межах короткої сторони та кількість
+    ферзів, що лишилися; однакові стани зливаються з сумою їхніх кількостей. Переходи зі стану
+    запам'ятовуються в lru_cache розміру cache_size. Швидко для вузьких дошок, наприклад 6 x N"""
+    lines, line_size = max(length, width), min(length, width)
+    if n > line_size:
+        return 0
+    if n == 0:
+        return 1
+
+    full = (1 << line_size) - 1
+
+    @lru_cache(maxsize=cache_size)
+    def moves(cols, ld, rd, remaining):
+        free = full & ~(cols | ld | rd)
+        result = [(cols, ld << 1 & full, rd >> 1, remaining)]
+        while free:
+            bit = free & -free
+            free ^= bit
+            result.append((cols | bit, (ld | bit) << 1 & full, (rd | bit) >> 1, remaining - 1))
+        return result
+
+    total = 0
+    states = {(0, 0, 0, n): 1}
+    for line in range(lines):
+        lines_left = lines - line - 1
+        following = {}
+        for state, count in states.items():
+            for move in moves(*state):
+                if move[3] == 0:
+                    total += count
+                elif move[3] <= lines_left:
+                    following[move] = following.get(move, 0) + count
+        states = following
+
+    return total
+
+
+def choose_engine(n, length, width):
+    """Вибирає рушій підрахунку за формою дошки: "dp" для вузьких довгих дошок і "backtracking" для решти"""
+    short, long = min(length, width), max(length, width)
+    if short <= DP_MAX_WIDTH and long >= 2 * short:
+        return "dp"
+    return "backtracking"
+
+
+def auto_count_queens(n, length, width):
+    """Рахує розміщення n ферзів рушієм, вибраним choose_engine. Повертає кількість і назву рушія"""
+    engine = choose_engine(n, length, width)
+    if engine == "dp":
+        return dp_count_queens(n, length, width), engine
+    return count_queens(n, length, width), engine
+
+
 def find_all_queens(n,length,width,queens=None,rows=None,cols=None,diag1=None,diag2=None,start_pos=0,callback=None,delay=0,final=None):
+    if queens is None and callback is None:
+        if final is None:
+            final = []
+        final.extend(generate_board(solution, length, width) for solution in iter_queens(n, length, width))
+        return final
+
     if queens is None:
         queens = []
     if rows is None:
@@ -86,6 +384,52 @@ def find_all_queens(n,length,width,queens=None,rows=None,cols=None,diag1=None,di
     return final
 
 
+def queen_steps(n, length, width):
+    """Ліниво перебирає кроки пошуку в тому ж порядку, що й find_all_queens з callback:
+    ("place", (i, j)), ("remove", (i, j)) та ("solution", кортеж координат ферзів)"""
+    queens = []
+    rows = [0] * length
+    cols = [0] * width
+    diag1 = [0] * (length + width - 1)
+    diag2 = [0] * (length + width - 1)
+
+    def search(start_pos):
+        if len(queens) == n:
+            yield "solution", tuple(queens)
+            return
+
+        for pos in range(start_pos, length * width):
+            i, j = divmod(pos, width)
+            d1 = i - j + (width - 1)
+            d2 = i + j
+            if rows[i] or cols[j] or diag1[d1] or diag2[d2]:
+                continue
+
+            queens.append((i, j))
+            rows[i] = cols[j] = diag1[d1] = diag2[d2] = 1
+            yield "place", (i, j)
+
+            yield from search(pos + 1)
+
+            queens.pop()
+            rows[i] = cols[j] = diag1[d1] = diag2[d2] = 0
+            yield "remove", (i, j)
+
+    return search(0)
+
+
+def attacked_cells(i, j, length, width):
+    """Повертає клітинки, які б'є ферзь на (i, j), без самої клітинки ферзя"""
+    cells = [(i, a) for a in range(width) if a != j]
+    cells += [(a, j) for a in range(length) if a != i]
+    for a in range(length):
+        if a != i:
+            for b in (j + a - i, j - a + i):
+                if 0 <= b < width:
+                    cells.append((a, b))
+    return cells
+
+
 class BacktrackingVisualizer:
     def __init__(self):
         self.root = tk.Tk()
@@ -159,30 +503,27 @@ class BacktrackingVisualizer:
             self.root, width=cols * CELL_SIZE, height=rows * CELL_SIZE
         )
         self.canvas.grid(row=2, column=0, padx=10, pady=10)
+        self.create_board(rows, cols)
 
         self.start_btn.config(state=tk.DISABLED)
         self.queens_entry.config(state=tk.DISABLED)
         self.rows_entry.config(state=tk.DISABLED)
         self.cols_entry.config(state=tk.DISABLED)
 
-        self.root.after(100, lambda: self.run_visualization(n, rows, cols))
-
-    def run_visualization(self, n, rows, cols):
-        delay = self.speed_slider.get() / 1000
-        find_all_queens(n, rows, cols, callback=self.draw_board, delay=delay)
-
-        self.start_btn.config(state=tk.NORMAL)
-        self.queens_entry.config(state=tk.NORMAL)
-        self.rows_entry.config(state=tk.NORMAL)
-        self.cols_entry.config(state=tk.NORMAL)
-
-    def draw_board(self, board, highlight=None):
-        if not self.canvas:
-            return
-
-        self.canvas.delete("all")
-        rows = len(board)
-        cols = len(board[0]) if rows > 0 else 0
+        self.steps = queen_steps(n, rows, cols)
+        self.root.after(100, self.play_frame)
+
+    def create_board(self, rows, cols):
+        """Створює елементи полотна для кожної клітинки один раз"""
+        self.rows = rows
+        self.cols = cols
+        self.items = {}
+        self.shown = {}
+        self.queens = set()
+        self.attacks = [[0] * cols for _ in range(rows)]
+        self.current = None
+        self.solution = False
+        self.dirty = set()
 
         for i in range(rows):
             for j in range(cols):
@@ -192,28 +533,102 @@ class BacktrackingVisualizer:
                 y2 = y1 + CELL_SIZE
 
                 color = "white" if (i + j) % 2 == 0 else "lightgray"
-                if highlight == "solution":
-                    color = "#90EE90"  # Light green
-                elif highlight and (i, j) in highlight:
-                    color = "#ADD8E6"  # Light blue
-
-                self.canvas.create_rectangle(
+                cell = self.canvas.create_rectangle(
                     x1, y1, x2, y2, fill=color, outline="black"
                 )
+                overlay = self.canvas.create_rectangle(
+                    x1 + 2, y1 + 2, x2 - 2, y2 - 2, fill="#ffcccc", outline="", state=tk.HIDDEN
+                )
+                queen = self.canvas.create_text(
+                    x1 + CELL_SIZE // 2,
+                    y1 + CELL_SIZE // 2,
+                    text="♛",
+                    font=("Arial", CELL_SIZE // 2),
+                    fill="red",
+                    state=tk.HIDDEN,
+                )
+                self.items[i, j] = (cell, overlay, queen)
+                self.shown[i, j] = (color, False, False)
+
+    def apply_step(self, step):
+        """Змінює стан дошки на один крок пошуку і запам'ятовує змінені клітинки"""
+        kind, value = step
+
+        if self.current:
+            self.dirty.add(self.current)
+            self.current = None
+        if self.solution:
+            self.dirty.update(self.items)
+            self.solution = False
+
+        if kind == "solution":
+            self.solution = True
+            self.dirty.update(self.items)
+            return
+
+        i, j = value
+        change = 1 if kind == "place" else -1
+        if kind == "place":
+            self.queens.add(value)
+            self.current = value
+        else:
+            self.queens.discard(value)
+        self.dirty.add(value)
+
+        for a, b in attacked_cells(i, j, self.rows, self.cols):
+            self.attacks[a][b] += change
+            if self.attacks[a][b] == (1 if change > 0 else 0):
+                self.dirty.add((a, b))
+
+    def render(self):
+        """Оновлює на полотні лише ті клітинки, вигляд яких змінився"""
+        for i, j in self.dirty:
+            color = "white" if (i + j) % 2 == 0 else "lightgray"
+            if self.solution:
+                color = "#90EE90"  # Light green
+            elif self.current == (i, j):
+                color = "#ADD8E6"  # Light blue
+
+            queen = (i, j) in self.queens
+            state = (color, queen, not queen and self.attacks[i][j] > 0)
+            if state == self.shown[i, j]:
+                continue
+
+            cell, overlay, text = self.items[i, j]
+            self.canvas.itemconfigure(cell, fill=color)
+            self.canvas.itemconfigure(overlay, state=tk.NORMAL if state[2] else tk.HIDDEN)
+            self.canvas.itemconfigure(text, state=tk.NORMAL if queen else tk.HIDDEN)
+            self.shown[i, j] = state
+        self.dirty.clear()
+
+    def play_frame(self):
+        """Програє кроки пошуку за один кадр. Якщо затримка менша за кадр,
+        за кадр виконується кілька кроків, а малюється лише результат"""
+        delay = self.speed_slider.get()
+        steps = FRAME_MS // delay if delay else None
+        deadline = time.perf_counter() + FRAME_MS / 1000
+
+        done = 0
+        for step in self.steps:
+            self.apply_step(step)
+            done += 1
+            if steps is not None and done >= steps or time.perf_counter() >= deadline:
+                break
+        else:
+            self.render()
+            self.finish_visualization()
+            return
+
+        self.render()
+        self.root.after(max(delay, FRAME_MS) if steps is not None and steps <= 1 else FRAME_MS, self.play_frame)
+
+    def finish_visualization(self):
+        self.start_btn.config(state=tk.NORMAL)
+        self.queens_entry.config(state=tk.NORMAL)
+        self.rows_entry.config(state=tk.NORMAL)
+        self.cols_entry.config(state=tk.NORMAL)
+
 
-                if board[i][j] == "Q":
-                    self.canvas.create_text(
-                        x1 + CELL_SIZE // 2,
-                        y1 + CELL_SIZE // 2,
-                        text="♛",
-                        font=("Arial", CELL_SIZE // 2),
-                        fill="red",
-                    )
-                elif board[i][j] == 1:
-                    self.canvas.create_rectangle(
-                        x1 + 2, y1 + 2, x2 - 2, y2 - 2, fill="#ffcccc", outline=""
-                    )
-        self.root.update()
 if __name__ == "__main__":
     BacktrackingVisualizer()
 
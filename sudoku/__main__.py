@@ -2,10 +2,14 @@
 Starting init for the sudoku app for 
 """
 
-import csv
 import argparse
-from sudoku_cls import Sudoku, sudoku_from_file, test_sudoku
+from sudoku_cls import Sudoku, sudoku_from_file
+from sat import encode_sudoku, write_dimacs
+from benchmark import ENGINES, run_benchmark, save_results, compare
 from sudoku_vis import init_visualization
+from batch import solve_batch
+from cache import SolutionCache
+from sudoku_trace import read_trace
 
 def main():
     """
@@ -15,12 +19,35 @@ def main():
     parser.add_argument("-f", "--file", type=str, default="")
     parser.add_argument("-s", "--size", type=int, default=0)
     parser.add_argument("-v", "--visualization", action="store_true")
+    parser.add_argument("-e", "--engine", type=str, choices=["dfs", "dlx", "sat", "numpy"], default="dfs")
+    parser.add_argument("-p", "--propagate", action="store_true")
+    parser.add_argument("--count", action="store_true")
+    parser.add_argument("--unique", action="store_true")
+    parser.add_argument("--dimacs", type=str, default="")
+    parser.add_argument("--cache", type=str, default="")
+    parser.add_argument("--cache_size", type=int, default=0)
+    parser.add_argument("--trace", type=str, default="")
+    parser.add_argument("--replay", type=str, default="")
 
     parser.add_argument("-t", "--test", action="store_true")
     parser.add_argument("--sizes", type=int, nargs="+")
     parser.add_argument("--iters", type=int)
     parser.add_argument("--fill_chances", type=float, nargs="+")
     parser.add_argument("--output_file", type=str)
+    parser.add_argument("--methods", type=str, nargs="+", choices=list(ENGINES),
+                        default=["backtracking", "greedy"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--node_limit", type=int, default=None)
+    parser.add_argument("--no_memory", action="store_true")
+    parser.add_argument("--baseline", type=str, default="")
+    parser.add_argument("--threshold", type=float, default=0.1)
+
+    parser.add_argument("-b", "--batch", type=str, default="")
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("--chunk_size", type=int, default=16)
+    parser.add_argument("--ordered", action="store_true")
+    parser.add_argument("--format", type=str, choices=["blocks", "lines"], default=None)
 
     args = parser.parse_args()
 
@@ -34,18 +61,69 @@ def main():
                   "must be specified when using --test.")
             return
 
-        print(f"Running tests with sizes={args.sizes}, iters={args.iters}, fill_chances={args.fill_chances}")
-        results = test_sudoku(args.sizes, args.iters, args.fill_chances)
+        print(f"Running tests with sizes={args.sizes}, iters={args.iters}, "
+              f"fill_chances={args.fill_chances}, seed={args.seed}")
+        results = run_benchmark(args.sizes, args.iters, args.fill_chances, args.methods,
+                                seed=args.seed, warmup=args.warmup, node_limit=args.node_limit,
+                                memory=not args.no_memory)
+
+        config = {"sizes": args.sizes, "iters": args.iters, "fill_chances": args.fill_chances,
+                  "methods": args.methods, "seed": args.seed, "warmup": args.warmup,
+                  "node_limit": args.node_limit}
+        document = save_results(args.output_file.strip("\""), results, config)
+
+        if args.baseline:
+            regressions = compare(document, args.baseline, args.threshold)
+
+            for message in regressions:
+                print(f"Regression: {message}")
+
+            if regressions:
+                raise SystemExit(1)
+
+            print("No regressions against the baseline.")
+
+        return
+
+    if args.batch:
+        if any([args.file, args.size, args.visualization]):
+            print("Error: --file, --size, or --visualization may not be used in batch mode.")
+            return
+
+        options = {"engine": args.engine, "propagate": args.propagate}
+
+        try:
+            if args.output_file:
+                with open(args.output_file, mode="w", encoding="utf-8") as output:
+                    stats = solve_batch(args.batch, output, args.jobs, args.chunk_size,
+                                        args.ordered, args.format, args.cache_size,
+                                        args.cache or None, **options)
+            else:
+                stats = solve_batch(args.batch, None, args.jobs, args.chunk_size,
+                                    args.ordered, args.format, args.cache_size,
+                                    args.cache or None, **options)
+        except FileNotFoundError:
+            print(f"Error: File '{args.batch}' not found, exiting.")
+            return
+
+        print(stats)
+
+        return
+
+    if args.replay:
+        try:
+            trace = read_trace(args.replay)
+        except FileNotFoundError:
+            print(f"Error: File '{args.replay}' not found, exiting.")
+            return
 
-        with open("sudoku/"+args.output_file.strip("\""), mode="w", newline="", encoding="utf-8") as csv_file:
-            writer = csv.writer(csv_file)
-            writer.writerow(["Board Size", "Fill Chance", "Method", "Time (s)"])
+        print(f"Loaded a trace of {len(trace)} events for a {trace.size}x{trace.size} Sudoku.")
+        init_visualization(None, trace)
 
-            for size, fill_results in results.items():
-                for fill, tests in fill_results.items():
-                    for method, _, time in tests:
-                        writer.writerow([f"{size}x{size}", fill, method, time])
+        return
 
+    if args.trace and (args.engine not in ("dfs", "dlx") or args.jobs):
+        print("Error: --trace can only be used with the dfs and dlx engines and without --jobs.")
         return
 
     if args.file and args.size:
@@ -65,11 +143,36 @@ def main():
         sudoku = Sudoku(9)
         print("No board or size specified. Created an empty 9x9 Sudoku.")
 
-    if args.visualization:
+    if args.dimacs:
+        with open(args.dimacs, mode="w", encoding="utf-8") as output:
+            write_dimacs(output, *encode_sudoku(sudoku))
+
+        print(f"CNF encoding written to {args.dimacs}")
+    elif args.visualization:
         init_visualization(sudoku)
+    elif args.count or args.unique:
+        if not sudoku.is_board_valid():
+            print("The provided board is invalid.")
+        elif args.count:
+            print(f"Number of solutions: {sudoku.count_solutions()}")
+        else:
+            uniqueness = "unique" if sudoku.is_unique() else "not unique"
+            print(f"The solution is {uniqueness}.")
     else:
         if sudoku.is_board_valid():
-            if sudoku.solve():
+            options = {"engine": args.engine, "propagate": args.propagate, "jobs": args.jobs,
+                       "trace": args.trace}
+
+            if args.cache or args.cache_size:
+                cache = SolutionCache(args.cache_size or 1024, args.cache or None)
+                solved = cache.solve(sudoku, **options)
+                cache.close()
+
+                print(cache)
+            else:
+                solved = sudoku.solve(**options)
+
+            if solved:
                 print(sudoku)
                 print("Solved Board:")
                 print(sudoku)
@@ -0,0 +1,330 @@
+"""
+Batch sudoku solving over a process pool
+"""
+
+from __future__ import annotations
+import sys
+import time
+import queue
+from array import array
+from itertools import islice
+from math import isqrt
+from multiprocessing import Pool
+from os import cpu_count
+from sudoku_cls import Sudoku, iter_puzzles, format_line, compact_cells
+from cache import SolutionCache, canonical_form, to_canonical, from_canonical
+
+worker_cache = None
+
+
+class BatchStats:
+    """
+    Throughput and latency summary of a batch run.
+    Latencies are kept as a flat array of doubles, not as result objects.
+    """
+    def __init__(self):
+        self.solved = 0
+        self.failed = 0
+        self.latencies = array("d")
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def total(self):
+        return self.solved + self.failed
+
+    def add(self, solved, latency, cached=None):
+        """
+        Records the outcome of one puzzle, cached tells if it was a cache hit when caching.
+        """
+        if solved:
+            self.solved += 1
+        else:
+            self.failed += 1
+
+        if cached is not None:
+            self.cache_hits += cached
+            self.cache_misses += not cached
+
+        self.latencies.append(latency)
+
+    def percentile(self, fraction):
+        """
+        Returns the latency below which the given fraction of puzzles finished.
+        """
+        if not self.latencies:
+            return 0.0
+
+        ordered = sorted(self.latencies)
+
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def __repr__(self):
+        rate = self.total / self.elapsed if self.elapsed else 0.0
+
+        summary = (f"Puzzles: {self.total} (solved {self.solved}, no solution {self.failed})\n"
+                   f"Time: {self.elapsed:.3f} s, {rate:.1f} puzzles/s\n"
+                   f"Latency: p50 {self.percentile(0.5) * 1000:.3f} ms, "
+                   f"p99 {self.percentile(0.99) * 1000:.3f} ms")
+
+        if self.cache_hits or self.cache_misses:
+            summary += f"\nCache: {self.cache_hits} hits, {self.cache_misses} misses"
+
+        return summary
+
+
+def iter_boards(file_name: str):
+    """
+    Lazily reads boards from a file with several comma separated boards divided by empty lines.
+    Lines starting with # are skipped.
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        board = []
+
+        for line in file:
+            line = line.strip()
+
+            if line.startswith("#"):
+                continue
+
+            if not line:
+                if board:
+                    yield board
+                    board = []
+                continue
+
+            board.append([int(num) if num.isnumeric() else None for num in line.split(",")])
+
+        if board:
+            yield board
+
+
+def detect_format(file_name: str) -> str:
+    """
+    Guesses whether a file holds comma separated boards divided by empty lines ("blocks")
+    or one puzzle per line ("lines"). A first block with as many lines as cells per line is
+    read as a board, anything else as single line puzzles.
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        lines = (line.strip() for line in file if not line.startswith("#"))
+        first = next((line for line in lines if line), "")
+
+        if "," not in first:
+            return "lines"
+
+        width = first.count(",") + 1
+        height = 1
+
+        for line in lines:
+            if not line or height > width:
+                break
+            height += 1
+
+    return "blocks" if height == width else "lines"
+
+
+def format_board(cells) -> str:
+    """
+    Formats a flat cell store in the comma separated file format, * marks an empty cell.
+    """
+    size = isqrt(len(cells))
+
+    return "\n".join(",".join(str(num) if num else "*" for num in cells[start:start + size])
+                     for start in range(0, size * size, size)) + "\n"
+
+
+def init_worker(cache_size, cache_path):
+    """
+    Gives a worker process its own solution cache.
+    """
+    global worker_cache
+
+    worker_cache = SolutionCache(cache_size, cache_path)
+
+
+def solve_chunk(number, chunk, options):
+    """
+    Solves a chunk of (index, board) pairs in a worker process.
+    Returns the chunk number and (index, solved flat cells or None, seconds, cache hit or None)
+    for every puzzle.
+    With the "numpy" engine the puzzles missing from the cache are propagated at once
+    and each of them is given an equal share of that time.
+    """
+    if options.get("engine") == "numpy":
+        return number, solve_chunk_vectorized(chunk)
+
+    results = []
+
+    for index, board in chunk:
+        start = time.perf_counter()
+
+        sudoku = Sudoku(board)
+        cached = None
+
+        if not sudoku.is_board_valid():
+            solved = False
+        elif worker_cache is not None:
+            hits = worker_cache.hits
+            solved = worker_cache.solve(sudoku, **options)
+            cached = worker_cache.hits > hits
+        else:
+            solved = sudoku.solve(**options)
+
+        results.append((index, bytes(sudoku.cells) if solved else None,
+                        time.perf_counter() - start, cached))
+
+    return number, results
+
+
+def solve_chunk_vectorized(chunk):
+    """
+    Solves a chunk of (index, board) pairs with solve_vectorized, looking every board up
+    in the worker cache first and caching the solutions of the rest.
+    """
+    from vectorized import solve_vectorized
+
+    results = {}
+    misses = []
+
+    for index, board in chunk:
+        start = time.perf_counter()
+
+        sudoku = Sudoku(board)
+
+        if not sudoku.is_board_valid():
+            results[index] = (index, None, time.perf_counter() - start, None)
+            continue
+
+        if worker_cache is None:
+            misses.append((index, sudoku, None, None))
+            continue
+
+        key, transform = canonical_form(sudoku)
+        solution = worker_cache.get(key)
+
+        if solution is None:
+            worker_cache.misses += 1
+            misses.append((index, sudoku, key, transform))
+            continue
+
+        worker_cache.hits += 1
+
+        if solution:
+            solution = bytes(compact_cells(from_canonical(solution, transform, sudoku.size),
+                                           sudoku.size))
+
+        results[index] = (index, solution or None, time.perf_counter() - start, True)
+
+    if misses:
+        start = time.perf_counter()
+        solutions = solve_vectorized([sudoku.cells for _, sudoku, _, _ in misses])
+        latency = (time.perf_counter() - start) / len(misses)
+
+        for (index, sudoku, key, transform), solution in zip(misses, solutions):
+            if key is not None:
+                worker_cache.put(key, to_canonical(solution, transform, sudoku.size)
+                                 if solution else b"")
+
+            results[index] = (index, solution, latency, False if key is not None else None)
+
+    return [results[index] for index, _ in chunk]
+
+
+def solve_batch(file_name: str, output=None, jobs=None, chunk_size=16, ordered=False,
+                file_format=None, cache_size=0, cache_path=None, **options) -> BatchStats:
+    """
+    Solves every board of a multi board file on a pool of jobs processes.
+    file_format is "blocks" or "lines" (see detect_format), solutions are written the same way.
+    With cache_size or cache_path every process looks boards up in a SolutionCache
+    of cache_size entries, backed by the sqlite file at cache_path if given.
+    Solutions are written to output (a file object, stdout by default) as their chunks finish,
+    or in input order if ordered is set. At most a few chunks per process are in flight,
+    so neither the input nor the output is ever held in memory as a whole.
+    options are passed on to Sudoku.solve.
+    """
+    output = output or sys.stdout
+    jobs = jobs or cpu_count() or 1
+
+    stats = BatchStats()
+    results = queue.Queue()
+
+    max_in_flight = jobs * 4
+    in_flight = 0
+
+    waiting = {}
+    next_number = 0
+
+    file_format = file_format or detect_format(file_name)
+
+    def write(chunk_results):
+        for index, cells, latency, cached in chunk_results:
+            stats.add(cells is not None, latency, cached)
+
+            output.write(f"# {index}\n")
+
+            if cells is None:
+                output.write("# no solution\n")
+            elif file_format == "lines":
+                output.write(format_line(cells) + "\n")
+            else:
+                output.write(format_board(cells))
+
+            if file_format == "blocks":
+                output.write("\n")
+
+    def collect():
+        nonlocal in_flight, next_number
+
+        result = results.get()
+
+        if isinstance(result, BaseException):
+            raise result
+
+        number, chunk_results = result
+
+        if not ordered:
+            write(chunk_results)
+            in_flight -= 1
+            return
+
+        # finished chunks parked in waiting still count as in flight until they are written,
+        # so a slow chunk holds back new submissions instead of letting waiting grow
+        waiting[number] = chunk_results
+
+        while next_number in waiting:
+            write(waiting.pop(next_number))
+            next_number += 1
+            in_flight -= 1
+
+    if file_format == "lines":
+        boards = enumerate(iter_puzzles(file_name))
+    else:
+        boards = enumerate(iter_boards(file_name))
+
+    if cache_size or cache_path:
+        pool = Pool(jobs, init_worker, (cache_size or 1024, cache_path))
+    else:
+        pool = Pool(jobs)
+
+    with pool:
+        number = 0
+
+        while chunk := list(islice(boards, chunk_size)):
+            pool.apply_async(solve_chunk, (number, chunk, options),
+                             callback=results.put, error_callback=results.put)
+            number += 1
+            in_flight += 1
+
+            while in_flight >= max_in_flight:
+                collect()
+
+        while in_flight:
+            collect()
+
+    output.flush()
+
+    stats.elapsed = time.perf_counter() - stats.start
+
+    return stats
@@ -0,0 +1,218 @@
+"""
+Sudoku benchmark harness
+"""
+
+from __future__ import annotations
+import csv
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from random import Random
+from statistics import median
+from sudoku_cls import Sudoku, SudokuSearch
+
+ENGINES = {
+    "backtracking": {},
+    "greedy": {"greedy": True},
+    "propagate": {"propagate": True},
+    "greedy_propagate": {"greedy": True, "propagate": True},
+    "dlx": {"engine": "dlx"},
+    "sat": {"engine": "sat"},
+}
+
+CSV_FIELDS = ["size", "fill_chance", "puzzle", "engine", "status", "time_ns", "nodes",
+              "backtracks", "nodes_per_s", "peak_bytes"]
+
+
+def fingerprint() -> dict:
+    """
+    Describes the machine and Python build the benchmark ran on.
+    """
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def make_corpus(size, fill_chance, count, seed) -> list:
+    """
+    Generates count puzzles of the given size as compact cell strings.
+    The same seed always gives the same puzzles.
+    """
+    rng = Random(f"{seed}-{size}-{fill_chance}")
+    sudoku = Sudoku(size)
+
+    corpus = []
+
+    for _ in range(count):
+        sudoku.fill(fill_chance, rng=rng)
+        corpus.append(bytes(sudoku.cells))
+
+    return corpus
+
+
+def run_engine(board, engine, node_limit=None) -> tuple:
+    """
+    Solves a copy of the board with the given engine.
+    Returns the status ("solved", "unsolvable" or "node_limit") and the solved Sudoku.
+    """
+    options = ENGINES[engine]
+    sudoku = Sudoku(board)
+
+    if "engine" in options:
+        result = sudoku.solve(**options)
+    else:
+        result = SudokuSearch(sudoku, **options).step(node_limit)
+
+    if result is None:
+        return "node_limit", sudoku
+
+    return ("solved" if result else "unsolvable"), sudoku
+
+
+def measure(board, engine, node_limit=None, memory=True) -> dict:
+    """
+    Times one solve with perf_counter_ns and records the search counters.
+    Peak memory comes from a second, traced run so tracing does not distort the timing.
+    """
+    sudoku = Sudoku(board)
+    options = ENGINES[engine]
+
+    if "engine" in options:
+        start = time.perf_counter_ns()
+        result = sudoku.solve(**options)
+        elapsed = time.perf_counter_ns() - start
+    else:
+        search = SudokuSearch(sudoku, **options)
+
+        start = time.perf_counter_ns()
+        result = search.step(node_limit)
+        elapsed = time.perf_counter_ns() - start
+
+    status = "node_limit" if result is None else "solved" if result else "unsolvable"
+
+    peak = None
+
+    if memory:
+        tracemalloc.start()
+        run_engine(board, engine, node_limit)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "engine": engine,
+        "status": status,
+        "time_ns": elapsed,
+        "nodes": sudoku.nodes,
+        "backtracks": sudoku.backtracks,
+        "nodes_per_s": round(sudoku.nodes / elapsed * 1e9, 1) if elapsed else 0.0,
+        "peak_bytes": peak,
+    }
+
+
+def run_benchmark(sizes, iters, fill_chances, engines=("backtracking", "greedy"), seed=0,
+                  warmup=1, node_limit=None, memory=True, verbose=True) -> list:
+    """
+    Benchmarks every engine on a seeded corpus of iters puzzles per size and fill chance.
+    Each engine first solves warmup puzzles that are not recorded.
+    """
+    results = []
+
+    for size in sizes:
+        for fill_chance in fill_chances:
+            corpus = make_corpus(size, fill_chance, iters, seed)
+
+            for engine in engines:
+                for board in corpus[:warmup]:
+                    run_engine(board, engine, node_limit)
+
+                for puzzle, board in enumerate(corpus):
+                    row = {"size": size, "fill_chance": fill_chance, "puzzle": puzzle}
+                    row.update(measure(board, engine, node_limit, memory))
+
+                    results.append(row)
+
+                if verbose:
+                    times = [row["time_ns"] for row in results[-len(corpus):]]
+                    print(f"{size}x{size} fill={fill_chance} {engine}: "
+                          f"median {median(times) / 1e6:.3f} ms", file=sys.stderr)
+
+    return results
+
+
+def summarize(results) -> dict:
+    """
+    Groups results by size, fill chance and engine into median time and total node counts.
+    """
+    groups = {}
+
+    for row in results:
+        key = f"{row['size']}x{row['size']}/{row['fill_chance']}/{row['engine']}"
+        groups.setdefault(key, []).append(row)
+
+    return {key: {
+        "median_time_ns": median(row["time_ns"] for row in rows),
+        "nodes": sum(row["nodes"] for row in rows),
+        "backtracks": sum(row["backtracks"] for row in rows),
+        "unfinished": sum(row["status"] == "node_limit" for row in rows),
+    } for key, rows in groups.items()}
+
+
+def save_results(file_name, results, config):
+    """
+    Writes the results to file_name as CSV and, next to it, as JSON with the machine fingerprint.
+    Returns the JSON document.
+    """
+    with open(file_name, mode="w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+    document = {
+        "fingerprint": fingerprint(),
+        "config": config,
+        "summary": summarize(results),
+        "results": results,
+    }
+
+    with open(os.path.splitext(file_name)[0] + ".json", mode="w", encoding="utf-8") as json_file:
+        json.dump(document, json_file, indent=2)
+
+    return document
+
+
+def compare(document, baseline_file, threshold=0.1) -> list[str]:
+    """
+    Compares a benchmark document with a saved baseline JSON file.
+    Returns a message for every group whose median time grew by more than threshold
+    or whose node count changed, since node counts are deterministic for a fixed seed.
+    """
+    with open(baseline_file, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+
+    regressions = []
+
+    for key, current in document["summary"].items():
+        previous = baseline["summary"].get(key)
+
+        if previous is None:
+            continue
+
+        if previous["median_time_ns"] and \
+                current["median_time_ns"] > previous["median_time_ns"] * (1 + threshold):
+            ratio = current["median_time_ns"] / previous["median_time_ns"]
+            regressions.append(f"{key}: median time {ratio:.2f}x of baseline")
+
+        if current["nodes"] != previous["nodes"]:
+            regressions.append(f"{key}: nodes {previous['nodes']} -> {current['nodes']}")
+
+    return regressions
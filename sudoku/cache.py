@@ -0,0 +1,292 @@
+"""
+Solution cache for sudokus that are the same up to symmetry
+"""
+
+from __future__ import annotations
+import sqlite3
+from collections import OrderedDict
+from itertools import groupby, permutations, product
+from math import factorial, prod
+from sudoku_cls import Sudoku, compact_cells
+
+
+def ranks(signatures):
+    """
+    Replaces every signature by its rank among the distinct signatures.
+    """
+    order = {signature: rank for rank, signature in enumerate(sorted(set(signatures)))}
+
+    return [order[signature] for signature in signatures]
+
+
+def line_signatures(grid, size, grid_width, grid_height, rounds=2):
+    """
+    Describes every row and column in a way that does not change under band, stack and
+    line permutations or under relabeling the numbers. A line starts out described by how
+    often its numbers occur on the whole board and by the number of givens in each of its boxes,
+    then rounds times more by the descriptions of the crossing lines it has givens in.
+    Returns the row and the column signatures as ranks.
+    """
+    frequency = [0] * (size + 1)
+
+    for num in grid:
+        frequency[num] += 1
+
+    row_givens = [[col for col in range(size) if grid[row * size + col]] for row in range(size)]
+    col_givens = [[row for row in range(size) if grid[row * size + col]] for col in range(size)]
+
+    rows = ranks([(tuple(sorted(frequency[grid[row * size + col]] for col in row_givens[row])),
+                   tuple(sorted(sum(1 for col in row_givens[row] if col // grid_width == stack)
+                                for stack in range(grid_height))))
+                  for row in range(size)])
+    cols = ranks([(tuple(sorted(frequency[grid[row * size + col]] for row in col_givens[col])),
+                   tuple(sorted(sum(1 for row in col_givens[col] if row // grid_height == band)
+                                for band in range(grid_width))))
+                  for col in range(size)])
+
+    for _ in range(rounds):
+        rows, cols = (ranks([(rows[row], tuple(sorted(cols[col] for col in row_givens[row])))
+                             for row in range(size)]),
+                      ranks([(cols[col], tuple(sorted(rows[row] for row in col_givens[col])))
+                             for col in range(size)]))
+
+    return rows, cols
+
+
+def line_orders(signatures, size, group_size, limit):
+    """
+    Returns every order of the lines that sorts the groups of group_size lines
+    and the lines within each group by signature. Equal signatures can go either way,
+    so there may be several. If there are more than limit, only the first one is returned.
+    """
+    groups = [sorted(range(start, start + group_size), key=signatures.__getitem__)
+              for start in range(0, size, group_size)]
+    groups.sort(key=lambda lines: [signatures[line] for line in lines])
+
+    def runs(items, key):
+        return [list(run) for _, run in groupby(items, key=key)]
+
+    line_runs = [runs(lines, signatures.__getitem__) for lines in groups]
+    group_runs = runs(range(len(groups)), lambda group: [signatures[line] for line in groups[group]])
+
+    count = prod(factorial(len(run)) for run in group_runs + sum(line_runs, []))
+
+    if count > limit:
+        return [[line for lines in groups for line in lines]]
+
+    inner = [[[line for part in parts for line in part]
+              for parts in product(*(permutations(run) for run in group))] for group in line_runs]
+
+    orders = []
+
+    for arrangement in product(*(permutations(run) for run in group_runs)):
+        sequence = [group for part in arrangement for group in part]
+
+        for choice in product(*(inner[group] for group in sequence)):
+            orders.append([line for lines in choice for line in lines])
+
+    return orders
+
+
+def canonical_form(sudoku: Sudoku, limit=16) -> tuple[bytes, tuple]:
+    """
+    Puts the board into a normal form under band, stack, row-within-band and
+    column-within-stack permutations, transposition (for square boxes) and relabeling.
+    Lines are ordered by line_signatures and numbers are renamed in order of first appearance.
+    The smallest result over the line orders allowed by equal signatures (up to limit of them
+    for rows and for columns) and over transposition is taken.
+    Returns the normal form as bytes and the transform (transposed, rows, cols, numbers).
+    """
+    size = sudoku.size
+    cells = sudoku.cells
+
+    best = None
+
+    for transposed in (False, True) if sudoku.grid_width == sudoku.grid_height else (False,):
+        grid = cells if not transposed else \
+            [cells[col * size + row] for row in range(size) for col in range(size)]
+
+        row_signatures, col_signatures = line_signatures(grid, size, sudoku.grid_width,
+                                                         sudoku.grid_height)
+
+        for rows in line_orders(row_signatures, size, sudoku.grid_height, limit):
+            for cols in line_orders(col_signatures, size, sudoku.grid_width, limit):
+                numbers = [0] * (size + 1)
+                label = 1
+                form = [0] * (size * size)
+
+                for i, row in enumerate(rows):
+                    for j, col in enumerate(cols):
+                        num = grid[row * size + col]
+
+                        if num:
+                            if not numbers[num]:
+                                numbers[num] = label
+                                label += 1
+
+                            form[i * size + j] = numbers[num]
+
+                for num in range(1, size + 1):
+                    if not numbers[num]:
+                        numbers[num] = label
+                        label += 1
+
+                key = bytes(compact_cells(form, size))
+
+                if best is None or key < best[0]:
+                    best = key, (transposed, rows, cols, numbers)
+
+    return best
+
+
+def positions(transform, size):
+    """
+    Yields (normal form index, board index) pairs for a transform.
+    """
+    transposed, rows, cols, _ = transform
+
+    for i, row in enumerate(rows):
+        for j, col in enumerate(cols):
+            yield i * size + j, col * size + row if transposed else row * size + col
+
+
+def to_canonical(cells, transform, size) -> bytes:
+    """
+    Maps a board (usually its solution) into the normal form given by the transform.
+    """
+    numbers = transform[3]
+    form = [0] * (size * size)
+
+    for index, original in positions(transform, size):
+        form[index] = numbers[cells[original]]
+
+    return bytes(compact_cells(form, size))
+
+
+def from_canonical(form, transform, size) -> list[int]:
+    """
+    Maps a normal form board back through the inverse of the transform.
+    """
+    inverse = [0] * (size + 1)
+
+    for num, label in enumerate(transform[3]):
+        inverse[label] = num
+
+    cells = [0] * (size * size)
+
+    for index, original in positions(transform, size):
+        cells[original] = inverse[form[index]]
+
+    return cells
+
+
+class SolutionCache:
+    """
+    Cache of sudoku solutions keyed by the canonical form of the board.
+    Holds up to max_size entries in memory, least recently used first out,
+    and optionally keeps every entry in a sqlite file at path.
+    Boards without a solution are cached as well.
+    """
+    def __init__(self, max_size=1024, path=None):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+        self.database = None
+
+        if path:
+            self.database = sqlite3.connect(path, timeout=30)
+            self.database.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                  "(form BLOB PRIMARY KEY, solution BLOB)")
+            self.database.commit()
+
+    def get(self, key):
+        """
+        Returns the cached solution for a normal form, b"" for no solution
+        and None if the form is not cached.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        if self.database is None:
+            return None
+
+        row = self.database.execute("SELECT solution FROM solutions WHERE form = ?",
+                                    (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        self.remember(key, row[0])
+
+        return row[0]
+
+    def put(self, key, solution):
+        """
+        Caches the solution of a normal form, b"" if it has none.
+        """
+        self.remember(key, solution)
+
+        if self.database is not None:
+            self.database.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)", (key, solution))
+            self.database.commit()
+
+    def remember(self, key, solution):
+        """
+        Adds an entry to the in-memory part, dropping the least recently used one if full.
+        """
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def solve(self, sudoku: Sudoku, **options) -> bool:
+        """
+        Solves the sudoku through the cache, options are passed on to Sudoku.solve on a miss.
+        """
+        size = sudoku.size
+        key, transform = canonical_form(sudoku)
+
+        solution = self.get(key)
+
+        if solution is not None:
+            self.hits += 1
+
+            if not solution:
+                return False
+
+            cells = from_canonical(solution, transform, size)
+
+            for index, num in enumerate(cells):
+                if not sudoku.cells[index]:
+                    sudoku.place(*divmod(index, size), num)
+
+            return True
+
+        self.misses += 1
+
+        if not sudoku.solve(**options):
+            self.put(key, b"")
+            return False
+
+        self.put(key, to_canonical(sudoku.cells, transform, size))
+
+        return True
+
+    def close(self):
+        """
+        Closes the sqlite file, if any.
+        """
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+    def __repr__(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+
+        return f"Cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)"
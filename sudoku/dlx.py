@@ -0,0 +1,281 @@
+"""
+Dancing Links (Algorithm X) exact cover engine for sudoku
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from sudoku_cls import Sudoku
+    from sudoku_vis import SudokuVis
+
+
+class DancingLinks:
+    """
+    Exact cover solver using Knuth's Algorithm X on a toroidal doubly linked list.
+    Nodes are stored in flat lists, index 0 is the root and 1..columns are the column headers.
+    """
+    def __init__(self, columns):
+        self.columns = columns
+
+        nodes = range(columns + 1)
+
+        self.left = [i - 1 for i in nodes]
+        self.right = [i + 1 for i in nodes]
+        self.up = list(nodes)
+        self.down = list(nodes)
+        self.column = list(nodes)
+        self.row_id = [None] * (columns + 1)
+        self.sizes = [0] * (columns + 1)
+
+        self.left[0] = columns
+        self.right[columns] = 0
+
+        self.row_start = {}
+
+        self.nodes = 0
+        self.backtracks = 0
+
+    def add_row(self, row_id, columns):
+        """
+        Adds a row covering the given columns (numbered from 0).
+        """
+        first = None
+
+        for col in columns:
+            header = col + 1
+            node = len(self.column)
+
+            self.column.append(header)
+            self.row_id.append(row_id)
+
+            self.up.append(self.up[header])
+            self.down.append(header)
+            self.down[self.up[header]] = node
+            self.up[header] = node
+            self.sizes[header] += 1
+
+            if first is None:
+                first = node
+                self.left.append(node)
+                self.right.append(node)
+            else:
+                self.left.append(self.left[first])
+                self.right.append(first)
+                self.right[self.left[first]] = node
+                self.left[first] = node
+
+        self.row_start[row_id] = first
+
+    def cover(self, header):
+        """
+        Removes a column and every row intersecting it from the matrix.
+        """
+        left, right, up, down, column, sizes = (self.left, self.right, self.up,
+                                                self.down, self.column, self.sizes)
+
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                sizes[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, header):
+        """
+        Restores a column removed by cover, in exactly the reverse order.
+        """
+        left, right, up, down, column, sizes = (self.left, self.right, self.up,
+                                                self.down, self.column, self.sizes)
+
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                sizes[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def select(self, row_id):
+        """
+        Forces a row into the solution before searching.
+        Returns False if the row clashes with an already selected one.
+        """
+        node = self.row_start[row_id]
+
+        if any(self.left[self.right[self.column[n]]] != self.column[n]
+               for n in self.row_nodes(node)):
+            return False
+
+        for n in self.row_nodes(node):
+            self.cover(self.column[n])
+
+        return True
+
+    def row_nodes(self, node):
+        """
+        Returns all nodes of the row containing node, starting with node.
+        """
+        nodes = [node]
+
+        j = self.right[node]
+        while j != node:
+            nodes.append(j)
+            j = self.right[j]
+
+        return nodes
+
+    def choose_column(self):
+        """
+        Returns the uncovered column with the fewest rows left.
+        """
+        right, sizes = self.right, self.sizes
+
+        best = right[0]
+        best_size = sizes[best]
+
+        c = right[best]
+        while c != 0 and best_size > 1:
+            if sizes[c] < best_size:
+                best = c
+                best_size = sizes[c]
+            c = right[c]
+
+        return best
+
+    def search(self, visualization=None):
+        """
+        Runs Algorithm X with an explicit stack.
+        Returns the list of chosen row ids or None if no exact cover exists.
+        """
+        right, left, down, column = self.right, self.left, self.down, self.column
+
+        stack = []
+        descend = True
+
+        while True:
+            if descend:
+                if right[0] == 0:
+                    return [self.row_id[node] for node in stack]
+
+                header = self.choose_column()
+                self.cover(header)
+                node = down[header]
+            else:
+                if not stack:
+                    return None
+
+                node = stack.pop()
+
+                j = left[node]
+                while j != node:
+                    self.uncover(column[j])
+                    j = left[j]
+
+                if visualization:
+                    visualization.unselect(self.row_id[node])
+
+                header = column[node]
+                node = down[node]
+
+            if node == header:
+                self.uncover(header)
+                self.backtracks += 1
+                descend = False
+                continue
+
+            self.nodes += 1
+            stack.append(node)
+
+            j = right[node]
+            while j != node:
+                self.cover(column[j])
+                j = right[j]
+
+            if visualization:
+                visualization.select(self.row_id[node])
+
+            descend = True
+
+
+class _CellUpdates:
+    """
+    Translates selected exact cover rows into SudokuVis cell updates.
+    """
+    def __init__(self, visualization: SudokuVis):
+        self.visualization = visualization
+
+    def select(self, row_id):
+        row, col, num = row_id
+        self.visualization.update_cell(row, col, num)
+
+    def unselect(self, row_id):
+        row, col, _ = row_id
+        self.visualization.update_cell(row, col, "")
+
+
+def build_exact_cover(sudoku: Sudoku) -> DancingLinks | None:
+    """
+    Encodes a sudoku as an exact cover matrix with the givens already selected.
+    Columns are cell, row-number, column-number and box-number constraints.
+    Returns None if the givens contradict each other.
+    """
+    size = sudoku.size
+    area = size * size
+
+    matrix = DancingLinks(4 * area)
+
+    for row in range(size):
+        for col in range(size):
+            box = sudoku.box_index(row, col)
+
+            for num in range(size):
+                matrix.add_row((row, col, num + 1), (row * size + col,
+                                                     area + row * size + num,
+                                                     2 * area + col * size + num,
+                                                     3 * area + box * size + num))
+
+    for row in range(size):
+        for col in range(size):
+            num = sudoku.cells[row * size + col]
+
+            if not num:
+                continue
+
+            if not 1 <= num <= size or not matrix.select((row, col, num)):
+                return None
+
+    return matrix
+
+
+def solve_dlx(sudoku: Sudoku, visualization: SudokuVis | None = None) -> bool:
+    """
+    Solves the sudoku with Dancing Links and writes the solution into its board.
+    """
+    matrix = build_exact_cover(sudoku)
+
+    if matrix is None:
+        return False
+
+    rows = matrix.search(_CellUpdates(visualization) if visualization else None)
+
+    sudoku.nodes = matrix.nodes
+    sudoku.backtracks = matrix.backtracks
+
+    if rows is None:
+        return False
+
+    for row, col, num in rows:
+        sudoku.place(row, col, num)
+
+    return True
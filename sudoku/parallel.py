@@ -0,0 +1,190 @@
+"""
+Parallel search for a single hard sudoku
+"""
+
+from __future__ import annotations
+import queue
+from collections import deque
+from multiprocessing import Process, Queue, Event, Value
+from os import cpu_count
+from sudoku_cls import Sudoku, SudokuSearch
+
+
+def split_search(sudoku: Sudoku, count, propagate=False):
+    """
+    Expands the top levels of the search tree breadth first until there are at least
+    count open subproblems, branching on the cell with the fewest candidates.
+    Returns a solved board if one turns up on the way and the list of subproblem boards.
+    """
+    frontier = deque([[row[:] for row in sudoku.board]])
+
+    while frontier and len(frontier) < count:
+        node = Sudoku(frontier.popleft())
+
+        if propagate and not node.propagate([]):
+            continue
+
+        node.generate_cell_order(greedy=True)
+
+        if not node.cell_order:
+            return node.board, []
+
+        row, col = node.cell_order[0]
+
+        for num in node.get_valid_numbers(row, col):
+            child = [cells[:] for cells in node.board]
+            child[row][col] = num
+
+            frontier.append(child)
+
+    return None, list(frontier)
+
+
+def donate(search: SudokuSearch, board, tasks, pending):
+    """
+    Gives half of the untried numbers of the shallowest splittable frame to the task queue,
+    as boards describing the search state at that frame.
+    """
+    sudoku = search.sudoku
+    stack = search.stack
+
+    for depth, (row, col, numbers, trail, index) in enumerate(stack):
+        rest = list(numbers)
+
+        if len(rest) < 2:
+            stack[depth] = (row, col, iter(rest), trail, index)
+            continue
+
+        keep, give = rest[:len(rest) // 2], rest[len(rest) // 2:]
+        stack[depth] = (row, col, iter(keep), trail, index)
+
+        current = sudoku.board
+        base = [cells[:] for cells in board]
+
+        for frame in stack[:depth + 1]:
+            for i, j in frame[3]:
+                base[i][j] = current[i][j]
+
+        for frame in stack[:depth]:
+            base[frame[0]][frame[1]] = current[frame[0]][frame[1]]
+
+        with pending.get_lock():
+            pending.value += len(give)
+
+        for num in give:
+            child = [cells[:] for cells in base]
+            child[row][col] = num
+
+            tasks.put(child)
+
+        return
+
+
+def search_worker(tasks, results, stop, pending, idle, options, slice_nodes):
+    """
+    Worker process loop: takes subproblems from the shared queue and searches them in slices,
+    checking the shared stop event between slices and sharing work with idle workers.
+    """
+    while not stop.is_set():
+        try:
+            board = tasks.get(timeout=0.05)
+        except queue.Empty:
+            continue
+
+        with idle.get_lock():
+            idle.value -= 1
+
+        sudoku = Sudoku([row[:] for row in board])
+        search = SudokuSearch(sudoku, **options)
+
+        while not stop.is_set():
+            result = search.step(slice_nodes)
+
+            if result is True:
+                stop.set()
+                results.put(sudoku.board)
+                break
+
+            if result is False:
+                break
+
+            if idle.value and tasks.empty():
+                donate(search, board, tasks, pending)
+
+        with idle.get_lock():
+            idle.value += 1
+
+        with pending.get_lock():
+            pending.value -= 1
+
+            if pending.value == 0:
+                results.put(None)
+
+
+def solve_parallel(sudoku: Sudoku, jobs=None, split_factor=8, slice_nodes=1000, **options):
+    """
+    Solves the sudoku by splitting its search tree into subproblems for jobs worker processes.
+    Idle workers get work split off from busy ones and every worker stops as soon as
+    one of them finds a solution, which is written into the board.
+    options are greedy and propagate as in Sudoku.solve.
+    """
+    jobs = jobs or cpu_count() or 1
+
+    solution, subproblems = split_search(sudoku, jobs * split_factor, options.get("propagate"))
+
+    if solution is None and not subproblems:
+        return False
+
+    if solution is None:
+        tasks = Queue()
+        results = Queue()
+        stop = Event()
+        pending = Value("i", len(subproblems))
+        idle = Value("i", jobs)
+
+        for board in subproblems:
+            tasks.put(board)
+
+        workers = [Process(target=search_worker, daemon=True,
+                           args=(tasks, results, stop, pending, idle, options, slice_nodes))
+                   for _ in range(jobs)]
+
+        for worker in workers:
+            worker.start()
+
+        while True:
+            finished = not any(worker.is_alive() for worker in workers)
+
+            try:
+                message = results.get(timeout=0.1)
+            except queue.Empty:
+                if finished:
+                    break
+                continue
+
+            if message is not None:
+                solution = message
+                break
+
+            # None only means no solution if nobody has found one: a solution put by another
+            # worker can arrive after the None sent when the last subproblem was cancelled
+            if not stop.is_set():
+                break
+
+        stop.set()
+
+        for worker in workers:
+            worker.join(timeout=1)
+
+            if worker.is_alive():
+                worker.terminate()
+
+        if solution is None:
+            return False
+
+    for row in range(sudoku.size):
+        for col in range(sudoku.size):
+            if not sudoku.cells[row * sudoku.size + col]:
+                sudoku.place(row, col, solution[row][col])
+
+    return True
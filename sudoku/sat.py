@@ -0,0 +1,439 @@
+"""
+SAT encoding and a CDCL solver for sudoku
+"""
+
+from __future__ import annotations
+from heapq import heappush, heappop
+from itertools import combinations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from sudoku_cls import Sudoku
+
+
+def luby(i):
+    """
+    Returns the i-th element (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    """
+    while True:
+        k = i.bit_length()
+
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+
+        i -= (1 << (k - 1)) - 1
+
+
+class CDCLSolver:
+    """
+    Conflict driven clause learning SAT solver.
+    Clauses use DIMACS literals (v or -v for variable v), internally a literal is 2*v for v
+    and 2*v+1 for -v. Unit propagation uses two watched literals per clause, conflicts are
+    analysed to the first unique implication point, decisions follow VSIDS activity with
+    saved phases and the search restarts on a Luby schedule.
+    """
+    def __init__(self, num_vars, restart_base=100, max_learnts=2000):
+        self.num_vars = num_vars
+        self.restart_base = restart_base
+        self.max_learnts = max_learnts
+
+        self.clauses = []
+        self.learnts = []
+        self.watches = [[] for _ in range(2 * num_vars + 2)]
+
+        self.values = [0] * (2 * num_vars + 2)
+        self.level = [0] * (num_vars + 1)
+        self.reason = [None] * (num_vars + 1)
+        self.phase = [False] * (num_vars + 1)
+        self.seen = [False] * (num_vars + 1)
+
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+
+        self.activity = [0.0] * (num_vars + 1)
+        self.increment = 1.0
+        self.heap = [(0.0, var) for var in range(1, num_vars + 1)]
+
+        self.ok = True
+
+        self.decisions = 0
+        self.conflicts = 0
+        self.propagations = 0
+        self.restarts = 0
+
+    def add_clause(self, literals):
+        """
+        Adds a clause of DIMACS literals. Must be called before solve.
+        Returns False once the clauses are known to be unsatisfiable.
+        """
+        if not self.ok:
+            return False
+
+        clause = []
+
+        for literal in literals:
+            lit = 2 * literal if literal > 0 else -2 * literal + 1
+
+            if self.values[lit] == 1 or lit ^ 1 in clause:
+                return True
+
+            if self.values[lit] == 0 and lit not in clause:
+                clause.append(lit)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause, self.clauses)
+
+        return self.ok
+
+    def attach(self, clause, store):
+        """
+        Stores a clause and watches its first two literals. Returns the clause.
+        """
+        store.append(clause)
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+        return clause
+
+    def enqueue(self, lit, reason):
+        """
+        Makes a literal true at the current decision level.
+        """
+        var = lit >> 1
+
+        self.values[lit] = 1
+        self.values[lit ^ 1] = -1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Propagates every literal queued on the trail.
+        Returns the conflicting clause, or None if there is no conflict.
+        """
+        values = self.values
+        watches = self.watches
+        trail = self.trail
+
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.propagations += 1
+
+            watchers = watches[false_lit]
+            kept = []
+
+            for position, clause in enumerate(watchers):
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+
+                first = clause[0]
+
+                if values[first] == 1:
+                    kept.append(clause)
+                    continue
+
+                for k in range(2, len(clause)):
+                    if values[clause[k]] != -1:
+                        clause[1], clause[k] = clause[k], false_lit
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+
+                    if values[first] == -1:
+                        kept.extend(watchers[position + 1:])
+                        watches[false_lit] = kept
+                        self.qhead = len(trail)
+                        return clause
+
+                    self.enqueue(first, clause)
+
+            watches[false_lit] = kept
+
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives the first unique implication point clause from a conflict.
+        Returns the learnt clause, asserting literal first, and the level to jump back to.
+        """
+        seen = self.seen
+        level = self.level
+        trail = self.trail
+        current = len(self.trail_lim)
+
+        learnt = [0]
+        counter = 0
+        lit = None
+        index = len(trail) - 1
+        clause = conflict
+
+        while True:
+            for other in clause if lit is None else clause[1:]:
+                var = other >> 1
+
+                if not seen[var] and level[var] > 0:
+                    seen[var] = True
+                    self.bump(var)
+
+                    if level[var] == current:
+                        counter += 1
+                    else:
+                        learnt.append(other)
+
+            while not seen[trail[index] >> 1]:
+                index -= 1
+
+            lit = trail[index]
+            index -= 1
+            seen[lit >> 1] = False
+            counter -= 1
+
+            if not counter:
+                break
+
+            clause = self.reason[lit >> 1]
+
+        learnt[0] = lit ^ 1
+
+        for other in learnt[1:]:
+            seen[other >> 1] = False
+
+        if len(learnt) == 1:
+            return learnt, 0
+
+        deepest = max(range(1, len(learnt)), key=lambda i: level[learnt[i] >> 1])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+
+        return learnt, level[learnt[1] >> 1]
+
+    def bump(self, var):
+        """
+        Raises the activity of a variable involved in a conflict.
+        """
+        self.activity[var] += self.increment
+
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in range(1, self.num_vars + 1)
+                         if not self.values[2 * v]]
+            self.heap.sort()
+        elif not self.values[2 * var]:
+            heappush(self.heap, (-self.activity[var], var))
+
+    def cancel_until(self, level):
+        """
+        Undoes every assignment above the given decision level, saving the phases.
+        """
+        if len(self.trail_lim) <= level:
+            return
+
+        start = self.trail_lim[level]
+
+        for lit in self.trail[start:]:
+            var = lit >> 1
+
+            self.values[lit] = self.values[lit ^ 1] = 0
+            self.reason[var] = None
+            self.phase[var] = not lit & 1
+
+            heappush(self.heap, (-self.activity[var], var))
+
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = start
+
+    def pick(self):
+        """
+        Returns the unassigned variable with the highest activity, or None if all are assigned.
+        """
+        heap = self.heap
+
+        while heap:
+            activity, var = heappop(heap)
+
+            if not self.values[2 * var] and -activity == self.activity[var]:
+                return var
+
+        for var in range(1, self.num_vars + 1):
+            if not self.values[2 * var]:
+                return var
+
+        return None
+
+    def reduce(self):
+        """
+        Forgets the longer half of the learnt clauses that are not the reason for an assignment.
+        """
+        locked = {id(self.reason[lit >> 1]) for lit in self.trail}
+        self.learnts.sort(key=len)
+
+        keep = len(self.learnts) // 2
+        removed = {id(clause) for clause in self.learnts[keep:] if id(clause) not in locked}
+
+        self.learnts = [clause for clause in self.learnts if id(clause) not in removed]
+        self.watches = [[clause for clause in watchers if id(clause) not in removed]
+                        for watchers in self.watches]
+
+    def solve(self, max_conflicts=None):
+        """
+        Searches for a satisfying assignment.
+        Returns True if one is found, False if the clauses are unsatisfiable
+        and None if max_conflicts conflicts were reached first.
+        """
+        if not self.ok or self.propagate() is not None:
+            self.ok = False
+            return False
+
+        restart = 1
+        restart_conflicts = 0
+
+        while True:
+            conflict = self.propagate()
+
+            if conflict is not None:
+                self.conflicts += 1
+                restart_conflicts += 1
+
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+
+                learnt, level = self.analyze(conflict)
+                self.cancel_until(level)
+
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.enqueue(learnt[0], self.attach(learnt, self.learnts))
+
+                self.increment /= 0.95
+
+                if max_conflicts is not None and self.conflicts >= max_conflicts:
+                    self.cancel_until(0)
+                    return None
+
+                continue
+
+            if restart_conflicts >= luby(restart) * self.restart_base:
+                self.restarts += 1
+                restart += 1
+                restart_conflicts = 0
+                self.cancel_until(0)
+
+            if len(self.learnts) - len(self.trail) >= self.max_learnts:
+                self.reduce()
+                self.max_learnts += self.max_learnts // 10
+
+            var = self.pick()
+
+            if var is None:
+                return True
+
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(2 * var + (0 if self.phase[var] else 1), None)
+
+    def model(self):
+        """
+        Returns the value of every variable after a successful solve, indexed from 1.
+        """
+        return [None] + [self.values[2 * var] == 1 for var in range(1, self.num_vars + 1)]
+
+
+def variable(row, col, num, size):
+    """
+    DIMACS variable meaning "the cell at row, col holds num", numbered from 1.
+    """
+    return (row * size + col) * size + num
+
+
+def encode_sudoku(sudoku: Sudoku) -> tuple[int, list[list[int]]]:
+    """
+    Encodes a sudoku as CNF over size^3 variables: every cell holds exactly one number,
+    every row, column and box holds every number exactly once, and the givens are unit clauses.
+    Returns the number of variables and the list of clauses.
+    """
+    size = sudoku.size
+    clauses = []
+
+    units = [[(row, col) for col in range(size)] for row in range(size)]
+    units += [[(row, col) for row in range(size)] for col in range(size)]
+    units += [unit for _, _, unit in sudoku.units[2 * size:]]
+
+    for row in range(size):
+        for col in range(size):
+            cell = [variable(row, col, num, size) for num in range(1, size + 1)]
+
+            clauses.append(cell)
+            clauses.extend([-first, -second] for first, second in combinations(cell, 2))
+
+    for unit in units:
+        for num in range(1, size + 1):
+            group = [variable(row, col, num, size) for row, col in unit]
+
+            clauses.append(group)
+            clauses.extend([-first, -second] for first, second in combinations(group, 2))
+
+    for row in range(size):
+        for col in range(size):
+            num = sudoku.cells[row * size + col]
+
+            if num:
+                clauses.append([variable(row, col, num, size)] if 1 <= num <= size else [])
+
+    return size ** 3, clauses
+
+
+def write_dimacs(output, num_vars, clauses):
+    """
+    Writes clauses to a text file object in the DIMACS CNF format.
+    """
+    output.write(f"p cnf {num_vars} {len(clauses)}\n")
+
+    for clause in clauses:
+        output.write(" ".join(map(str, clause)) + " 0\n")
+
+
+def solve_sat(sudoku: Sudoku, max_conflicts=None) -> bool:
+    """
+    Solves the sudoku with the CDCL solver and writes the solution into its board.
+    Decisions are counted as nodes and conflicts as backtracks.
+    """
+    num_vars, clauses = encode_sudoku(sudoku)
+    solver = CDCLSolver(num_vars)
+
+    for clause in clauses:
+        if not solver.add_clause(clause):
+            break
+
+    result = solver.solve(max_conflicts)
+
+    sudoku.nodes = solver.decisions
+    sudoku.backtracks = solver.conflicts
+
+    if not result:
+        return False
+
+    model = solver.model()
+    size = sudoku.size
+
+    for row in range(size):
+        for col in range(size):
+            if sudoku.cells[row * size + col]:
+                continue
+
+            for num in range(1, size + 1):
+                if model[variable(row, col, num, size)]:
+                    sudoku.place(row, col, num)
+                    break
+
+    return True
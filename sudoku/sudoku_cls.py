@@ -3,11 +3,14 @@ Sudoku algorithm
 """
 
 from __future__ import annotations
-from math import log10, ceil
-from random import random, shuffle
-import time
-from copy import deepcopy
+from array import array
+from heapq import heappop, heappush
+from math import log10, ceil, isqrt
+from random import Random, random, shuffle
 from typing import TYPE_CHECKING
+from dlx import solve_dlx
+from sat import solve_sat
+from sudoku_trace import TraceWriter
 if TYPE_CHECKING:
     from sudoku_vis import SudokuVis
 
@@ -18,175 +21,424 @@ class UserAbortedError(Exception):
 class Sudoku:
     """
     Sudoku implementation.
+    The board is stored as a flat bytearray (array('H') for sizes over 255) indexed by
+    row*size+col, with 0 for an empty cell.
     """
     def __init__(self, board=9):
         if isinstance(board, int):
-            self.size = board
-            self.board = [[None] * self.size for _ in range(self.size)]
+            size = board
+            board = compact_cells([0] * (size * size), size)
 
         elif isinstance(board, list):
-            self.board = board
+            size = len(board)
 
-            self.size = len(self.board)
-
-            if any(self.size != len(row) for row in self):
+            if any(size != len(row) for row in board):
                 raise ValueError("Board width and height should be the same.")
+
+        elif isinstance(board, (bytes, bytearray, array)):
+            size = isqrt(len(board))
+
+            if size * size != len(board):
+                raise ValueError("Compact board length should be a square number.")
         else:
             raise TypeError
 
+        self.size = size
+        self.full_mask = (1 << self.size) - 1
+
         self.grid_width = get_closest_grid(self.size)
         self.grid_height = self.size//self.grid_width
 
+        self.row_masks = [0] * self.size
+        self.col_masks = [0] * self.size
+        self.box_masks = [0] * self.size
+
+        self.units = [(self.row_masks, i, [(i, j) for j in range(self.size)])
+                      for i in range(self.size)]
+        self.units += [(self.col_masks, j, [(i, j) for i in range(self.size)])
+                       for j in range(self.size)]
+        self.units += [(self.box_masks, b,
+                        [(b // self.grid_height * self.grid_height + i // self.grid_width,
+                          b % self.grid_height * self.grid_width + i % self.grid_width)
+                         for i in range(self.size)])
+                       for b in range(self.size)]
+
+        self.mrv = None
+
+        self.board = board
+
         self.cell_order = []
 
-        self.stop_solve = False
+        self.nodes = 0
+        self.backtracks = 0
+        self.propagated = 0
 
         self.generate_cell_order()
 
+    @property
+    def board(self):
+        """
+        A copy of the board as a list of rows, None marks an empty cell.
+        Single cells are read and written through sudoku[row][col].
+        """
+        size = self.size
+        cells = self.cells
+
+        return [[num or None for num in cells[start:start + size]]
+                for start in range(0, size * size, size)]
+
+    @board.setter
+    def board(self, board):
+        if isinstance(board, list):
+            board = [num or 0 for row in board for num in row]
+
+        # Numbers out of range are kept as size + 1 so update_masks reports the board as invalid
+        size = self.size
+        board = [num if 0 <= num <= size else size + 1 for num in board]
+
+        self.cells = compact_cells(board, size)
+        self.update_masks()
+
     def __iter__(self):
-        return iter(self.board)
+        return (SudokuRow(self, row) for row in range(self.size))
 
     def __getitem__(self, index):
-        return self.board[index]
+        return SudokuRow(self, index)
 
-    def get_valid_numbers(self, row, col):
+    def box_index(self, row, col):
         """
-        Returns a list of all valid numbers for the given cell.
+        Returns the index of the box containing the given cell.
+        """
+        return row // self.grid_height * self.grid_height + col // self.grid_width
+
+    def update_masks(self):
+        """
+        Rebuilds the row, column and box occupancy bitmasks from the board.
+        Bit n-1 of a mask is set when the number n is placed in that unit.
+        Returns False if the board contains a duplicate or an out of range number.
         """
-        invalid_numbers = set()
+        self.row_masks[:] = [0] * self.size
+        self.col_masks[:] = [0] * self.size
+        self.box_masks[:] = [0] * self.size
 
-        start_row = row // self.grid_height * self.grid_height
-        start_col = col // self.grid_width * self.grid_width
+        valid = True
 
         for i in range(self.size):
-            invalid_numbers.add(self[row][i])
+            for j in range(self.size):
+                cell = self.cells[i * self.size + j]
+                if not cell:
+                    continue
+
+                if not 1 <= cell <= self.size:
+                    valid = False
+                    continue
+
+                bit = 1 << (cell - 1)
+                box = self.box_index(i, j)
+
+                if (self.row_masks[i] | self.col_masks[j] | self.box_masks[box]) & bit:
+                    valid = False
+
+                self.row_masks[i] |= bit
+                self.col_masks[j] |= bit
+                self.box_masks[box] |= bit
 
-            invalid_numbers.add(self[i][col])
+        return valid
 
-            invalid_numbers.add(self[start_row+i%self.grid_height][start_col+i//self.grid_width])
+    def place(self, row, col, num):
+        """
+        Places num in the given empty cell and marks it in the occupancy masks.
+        """
+        bit = 1 << (num - 1)
 
+        self.cells[row * self.size + col] = num
+        self.row_masks[row] |= bit
+        self.col_masks[col] |= bit
+        self.box_masks[self.box_index(row, col)] |= bit
 
-        return [num for num in range(1, self.size + 1) if num not in invalid_numbers]
+        if self.mrv is not None:
+            self.mrv.changed(row, col)
+
+    def remove(self, row, col):
+        """
+        Empties the given cell and unmarks its number in the occupancy masks.
+        """
+        index = row * self.size + col
+        mask = ~(1 << (self.cells[index] - 1))
+
+        self.cells[index] = 0
+        self.row_masks[row] &= mask
+        self.col_masks[col] &= mask
+        self.box_masks[self.box_index(row, col)] &= mask
+
+        if self.mrv is not None:
+            self.mrv.changed(row, col)
+
+    def set_cell(self, row, col, num):
+        """
+        Sets a cell to num, or empties it if num is None, keeping the masks up to date.
+        """
+        if self.cells[row * self.size + col]:
+            self.remove(row, col)
+
+        if num:
+            self.place(row, col, num)
+
+    def get_candidates(self, row, col):
+        """
+        Returns a bitmask of the numbers that can be placed in the given cell.
+        """
+        return self.full_mask & ~(self.row_masks[row] | self.col_masks[col]
+                                  | self.box_masks[self.box_index(row, col)])
+
+    def get_valid_numbers(self, row, col):
+        """
+        Returns a list of all valid numbers for the given cell.
+        """
+        return mask_to_numbers(self.get_candidates(row, col))
 
     def find_next_cell(self):
         """
         Finds the next empty cell with the fewest valid options.
         """
         for row, col in self.cell_order:
-            if self[row][col] is None:
+            if not self.cells[row * self.size + col]:
                 return (row, col)
 
         return None
 
-    def solve(self, greedy = False, visualization: SudokuVis | None = None, random_fill=False):
+    def propagate(self, trail, visualization: SudokuVis | None = None):
         """
-        Solves the Sudoku board using DFS with optimized valid number calculation.
+        Fills naked singles (cells with one option) and hidden singles (numbers with one
+        possible cell in a row, column or box) until none are left.
+        Placed cells are appended to trail so they can be undone.
+        Returns False if a cell or a number runs out of options.
         """
-        if self.stop_solve:
-            self.stop_solve = False
-            raise StopIteration
+        cells = self.cells
+        size = self.size
 
-        if greedy:
-            self.generate_cell_order(greedy=True)
+        changed = True
 
-        cell = self.find_next_cell()
+        while changed:
+            changed = False
 
-        if cell is None:
-            return True
+            for row, col in self.cell_order:
+                if cells[row * size + col]:
+                    continue
 
-        row, col = cell
+                candidates = self.get_candidates(row, col)
 
-        valid_numbers = self.get_valid_numbers(row, col)
+                if not candidates:
+                    return False
 
-        if random_fill:
-            shuffle(valid_numbers)
+                if not candidates & (candidates - 1):
+                    self.assign(row, col, candidates.bit_length(), trail, visualization)
+                    changed = True
 
-        for num in valid_numbers:
-            self[row][col] = num
+            for masks, index, unit in self.units:
+                missing = self.full_mask & ~masks[index]
 
-            if visualization:
-                visualization.update_cell(row, col, num)
+                if not missing:
+                    continue
 
-            if self.solve(greedy=greedy, visualization=visualization, random_fill=random_fill):
-                return True
+                once = twice = 0
 
-            self[row][col] = None
+                for row, col in unit:
+                    if not cells[row * size + col]:
+                        candidates = self.get_candidates(row, col)
+                        twice |= once & candidates
+                        once |= candidates
+
+                if missing & ~once:
+                    return False
+
+                hidden = missing & ~twice
+
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+
+                    for row, col in unit:
+                        if not cells[row * size + col] and self.get_candidates(row, col) & bit:
+                            self.assign(row, col, bit.bit_length(), trail, visualization)
+                            changed = True
+                            break
+                    else:
+                        return False
+
+        return True
+
+    def assign(self, row, col, num, trail, visualization: SudokuVis | None = None):
+        """
+        Places a number found by propagation and records it on the trail.
+        """
+        self.place(row, col, num)
+        trail.append((row, col))
+        self.propagated += 1
+
+        if visualization:
+            visualization.update_cell(row, col, num)
+
+    def undo(self, trail, visualization: SudokuVis | None = None):
+        """
+        Empties every cell recorded on the trail, newest first.
+        """
+        while trail:
+            row, col = trail.pop()
+            self.remove(row, col)
 
             if visualization:
                 visualization.update_cell(row, col, "")
 
-        return False
+    def solve(self, greedy = False, visualization: SudokuVis | None = None, random_fill=False,
+              engine="dfs", propagate=False, jobs=None, trace=None):
+        """
+        Solves the Sudoku board using DFS with optimized valid number calculation.
+        With propagate=True naked and hidden singles are filled before every branch.
+        With jobs the search tree is split between that many worker processes.
+        With engine="dlx" the board is solved as an exact cover problem with Dancing Links instead,
+        with engine="sat" it is encoded as CNF and solved by a CDCL SAT solver
+        and with engine="numpy" singles are propagated with NumPy before searching.
+        With trace set to a file name every placed and removed number is recorded there
+        (see sudoku_trace.TraceWriter) for replaying later. Only the dfs and dlx engines
+        without jobs report their cell changes, so trace can not be used with the others.
+        """
+        if trace:
+            if engine not in ("dfs", "dlx") or jobs:
+                raise ValueError("Traces can only be recorded with the dfs and dlx engines "
+                                 "and without jobs.")
 
-    def is_board_valid(self):
+            with TraceWriter(trace, self, visualization) as writer:
+                return self.solve(greedy, writer, random_fill, engine, propagate, jobs)
+
+        if engine == "dlx":
+            return solve_dlx(self, visualization=visualization)
+
+        if engine == "sat":
+            return solve_sat(self)
+
+        if engine == "numpy":
+            from vectorized import solve_vectorized
+
+            solution = solve_vectorized([self.cells])[0]
+
+            if solution is None:
+                return False
+
+            for row in range(self.size):
+                for col in range(self.size):
+                    if not self.cells[row * self.size + col]:
+                        self.place(row, col, solution[row * self.size + col])
+
+            return True
+
+        if engine != "dfs":
+            raise ValueError(f"Unknown sudoku engine: {engine}")
+
+        if jobs:
+            from parallel import solve_parallel
+
+            return solve_parallel(self, jobs, greedy=greedy, propagate=propagate)
+
+        return SudokuSearch(self, greedy=greedy, visualization=visualization,
+                            random_fill=random_fill, propagate=propagate).step()
+
+    def count_solutions(self, limit=None, greedy=True, propagate=True):
         """
-        Returns true or false depending on if the board is valid.
+        Counts the solutions of the board, stopping early once limit solutions are found.
+        Solutions are counted in place without copying the board, which is left unchanged.
         """
-        rows = {i: set() for i in range(self.size)}
-        columns = {i: set() for i in range(self.size)}
+        if not self.is_board_valid():
+            return 0
 
-        for i in range(self.size):
-            for j in range(self.size):
-                cell = self[i][j]
-                if cell is None:
-                    continue
+        search = SudokuSearch(self, greedy=greedy, propagate=propagate, counting=True, limit=limit)
+        search.step()
 
-                if not 1 <= cell <= self.size:
-                    return False
+        return search.solutions
 
-                if cell in rows[i]:
-                    return False
+    def is_unique(self):
+        """
+        Returns True if the board has exactly one solution, stopping at the second one found.
+        """
+        return self.count_solutions(limit=2) == 1
+
+    def reuse_solution(self, solution):
+        """
+        Fills the empty cells with the numbers of a previous solution (flat cells) of a board
+        with mostly the same givens. Cells sharing a row, column or box with a given that
+        disagrees with the solution are left empty, so only they have to be searched again.
+        Returns the flat indices of the filled cells, or None if the result is contradictory.
+        """
+        size = self.size
+        cells = self.cells
 
-                rows[i].add(cell)
+        if len(solution) != len(cells):
+            return None
 
-                if cell in columns[j]:
-                    return False
+        affected = set()
 
-                columns[j].add(cell)
+        for index, num in enumerate(cells):
+            if num and num != solution[index]:
+                row, col = divmod(index, size)
 
-        for row_start in range(self.grid_width):
-            for col_start in range(self.grid_height):
-                grid = set()
+                affected.update(row * size + j for j in range(size))
+                affected.update(i * size + col for i in range(size))
+                affected.update(i * size + j for i, j in
+                                self.units[2 * size + self.box_index(row, col)][2])
 
-                for i in range(self.grid_height):
-                    for j in range(self.grid_width):
-                        cell = self[row_start*self.grid_height+i][col_start*self.grid_width+j]
+        filled = [index for index, num in enumerate(cells) if not num and index not in affected]
 
-                        if cell is None:
-                            continue
+        for index in filled:
+            cells[index] = solution[index]
 
-                        if cell in grid:
-                            return False
+        if not self.update_masks():
+            for index in filled:
+                cells[index] = 0
 
-                        grid.add(cell)
+            self.update_masks()
 
-        return True
+            return None
+
+        return filled
+
+    def is_board_valid(self):
+        """
+        Returns true or false depending on if the board is valid.
+        """
+        return self.update_masks()
 
     def generate_cell_order(self, greedy=False):
         """
         Returns a sorted list cell ordered by cells that have the least options.
         """
-        cells=[(i,j)for i in range(self.size) for j in range(self.size) if self[i][j] is None]
+        cells=[(i,j)for i in range(self.size) for j in range(self.size)
+               if not self.cells[i * self.size + j]]
 
         if greedy:
             def sort_key(item):
-                return len(self.get_valid_numbers(item[0], item[1]))
+                return self.get_candidates(item[0], item[1]).bit_count()
 
             cells.sort(key=sort_key)
 
         self.cell_order = cells
 
-    def fill(self, fill_chance):
+    def fill(self, fill_chance, rng: Random | None = None):
         """
         Randomly fills the Sudoku board based on the given fill chance.
-        Ensures that the board remains valid during the process.
+        A random complete grid is generated without search (see generate_grid)
+        and every cell is then kept with probability fill_chance.
+        Pass a seeded rng to get the same board every time.
         """
-        self.clear()
+        chance = rng.random if rng is not None else random
 
-        self.generate_cell_order()
+        self.board = compact_cells(generate_grid(self.size, rng), self.size)
 
-        self.solve(random_fill=True)
+        for i in range(self.size):
+            for j in range(self.size):
+                if chance() >= fill_chance:
+                    self.remove(i, j)
 
-        self.board = [[cell if random() < fill_chance else None for cell in row] for row in self]
+        self.generate_cell_order()
 
     def clear(self, value=None):
         """
@@ -197,9 +449,365 @@ class Sudoku:
     def __repr__(self):
         cell_width = ceil(log10(self.size + 1))
 
-        return "\n".join(''.join(f"{(self[i][j] or '')}".rjust(cell_width, '*')
+        return "\n".join(''.join(f"{(self.cells[i * self.size + j] or '')}".rjust(cell_width, '*')
                      for j in range(self.size)) for i in range(self.size)) + "\n"
 
+class SudokuRow:
+    """
+    One row of a Sudoku read straight from its flat cell store, empty cells read as None.
+    Writing a cell goes through Sudoku.set_cell so the masks stay up to date.
+    """
+    def __init__(self, sudoku: Sudoku, row):
+        self.sudoku = sudoku
+        self.row = row
+
+    def __len__(self):
+        return self.sudoku.size
+
+    def __iter__(self):
+        start = self.row * self.sudoku.size
+
+        return (num or None for num in self.sudoku.cells[start:start + self.sudoku.size])
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return list(self)[col]
+
+        if col < 0:
+            col += self.sudoku.size
+
+        return self.sudoku.cells[self.row * self.sudoku.size + col] or None
+
+    def __setitem__(self, col, num):
+        self.sudoku.set_cell(self.row, col, num)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+class SudokuSearch:
+    """
+    Resumable depth first search over a Sudoku board.
+    Keeps an explicit stack of (cell, candidate iterator, trail) frames instead of recursing,
+    so the depth is not limited by the recursion limit and the search can be advanced in slices.
+    With counting=True it keeps going after a solution until limit solutions are found
+    and then puts the board back the way it was.
+    """
+    def __init__(self, sudoku: Sudoku, greedy=False, visualization: SudokuVis | None = None,
+                 random_fill=False, propagate=False, counting=False, limit=None,
+                 rng: Random | None = None):
+        self.sudoku = sudoku
+        self.greedy = greedy
+        self.visualization = visualization
+        self.random_fill = random_fill
+        self.shuffle = rng.shuffle if rng is not None else shuffle
+        self.propagate = propagate
+        self.counting = counting
+        self.limit = limit
+
+        self.solutions = 0
+
+        self.stack = []
+        self.started = False
+        self.result = None
+
+        self.buckets = CandidateBuckets(sudoku) if greedy else None
+
+    def step(self, max_nodes=None):
+        """
+        Advances the search by at most max_nodes assignments, or until it ends if max_nodes is None.
+        Returns True once solved, False if there is no solution and None if the search is unfinished.
+        """
+        if self.result is not None:
+            return self.result
+
+        sudoku = self.sudoku
+        cells = sudoku.cells
+        size = sudoku.size
+        visualization = self.visualization
+        stack = self.stack
+
+        sudoku.mrv = self.buckets
+
+        if not self.started:
+            self.started = True
+
+            if self.expand(0) and self.solution_found():
+                return self.finish(True)
+
+        budget = max_nodes
+
+        while stack:
+            if budget is not None and budget <= 0:
+                sudoku.mrv = None
+                return None
+
+            frame = stack[-1]
+            row, col, numbers, trail, index = frame
+
+            if cells[row * size + col]:
+                sudoku.remove(row, col)
+
+                if visualization:
+                    visualization.update_cell(row, col, "")
+
+            num = next(numbers, None)
+
+            if num is None:
+                stack.pop()
+                sudoku.undo(trail, visualization)
+                sudoku.backtracks += 1
+                continue
+
+            if budget is not None:
+                budget -= 1
+
+            sudoku.place(row, col, num)
+            sudoku.nodes += 1
+
+            if visualization:
+                visualization.update_cell(row, col, num)
+
+            if self.expand(index) and self.solution_found():
+                return self.finish(True)
+
+        return self.finish(self.solutions > 0)
+
+    def finish(self, result):
+        """
+        Stores the final result and detaches the candidate buckets from the board.
+        When counting, every cell placed by the search is emptied again.
+        """
+        self.result = result
+
+        if self.counting:
+            while self.stack:
+                row, col, _, trail, _ = self.stack.pop()
+
+                if self.sudoku.cells[row * self.sudoku.size + col]:
+                    self.sudoku.remove(row, col)
+
+                self.sudoku.undo(trail)
+
+        self.sudoku.mrv = None
+
+        return result
+
+    def solution_found(self):
+        """
+        Records a complete board. Returns True if the search should stop here.
+        """
+        self.solutions += 1
+
+        return not self.counting or (self.limit is not None and self.solutions >= self.limit)
+
+    def expand(self, start):
+        """
+        Enters a search node: propagates if enabled, picks the next empty cell and pushes its frame.
+        Returns True if the board is complete, otherwise False.
+        """
+        sudoku = self.sudoku
+        trail = []
+
+        if self.propagate and not sudoku.propagate(trail, self.visualization):
+            sudoku.undo(trail, self.visualization)
+            sudoku.backtracks += 1
+            return False
+
+        if self.buckets is not None:
+            index = start
+            cell = self.buckets.best()
+
+            if cell is None:
+                return self.complete(trail)
+
+            row, col = cell
+        else:
+            cells = sudoku.cells
+            size = sudoku.size
+            order = sudoku.cell_order
+
+            for index in range(start, len(order)):
+                row, col = order[index]
+
+                if not cells[row * size + col]:
+                    break
+            else:
+                return self.complete(trail)
+
+        valid_numbers = sudoku.get_valid_numbers(row, col)
+
+        if self.random_fill:
+            self.shuffle(valid_numbers)
+
+        self.stack.append((row, col, iter(valid_numbers), trail, index))
+
+        return False
+
+    def complete(self, trail):
+        """
+        Handles a full board. When counting, cells filled by propagation on the way
+        are emptied so the search can go on.
+        """
+        if self.counting:
+            self.sudoku.undo(trail, self.visualization)
+
+        return True
+
+class CandidateBuckets:
+    """
+    Empty cells grouped into buckets by their number of candidates, for minimum remaining
+    values cell selection. Only the peers of a changed cell are moved between buckets.
+    Every bucket also has a heap of its cell indexes, so the lowest one is found without
+    scanning the bucket. Cells that left a bucket are dropped from its heap lazily.
+    """
+    def __init__(self, sudoku: Sudoku):
+        self.sudoku = sudoku
+
+        size = sudoku.size
+
+        self.peers = [set() for _ in range(size * size)]
+
+        for _, _, cells in sudoku.units:
+            indexes = [row * size + col for row, col in cells]
+
+            for index in indexes:
+                self.peers[index].update(indexes)
+
+        for index, peers in enumerate(self.peers):
+            peers.discard(index)
+
+        self.peers = [sorted(peers) for peers in self.peers]
+
+        self.buckets = [set() for _ in range(size + 1)]
+        self.heaps = [[] for _ in range(size + 1)]
+        self.counts = [None] * (size * size)
+
+        for row in range(size):
+            for col in range(size):
+                self.update(row * size + col)
+
+    def update(self, index):
+        """
+        Moves a cell to the bucket matching its current candidate count.
+        Filled cells are taken out of the buckets.
+        """
+        row, col = divmod(index, self.sudoku.size)
+
+        if not self.sudoku.cells[index]:
+            count = self.sudoku.get_candidates(row, col).bit_count()
+        else:
+            count = None
+
+        old = self.counts[index]
+
+        if old == count:
+            return
+
+        if old is not None:
+            self.buckets[old].discard(index)
+
+        if count is not None:
+            bucket = self.buckets[count]
+            heap = self.heaps[count]
+
+            bucket.add(index)
+
+            if len(heap) > 2 * len(bucket) + self.sudoku.size:
+                heap[:] = sorted(bucket)
+            else:
+                heappush(heap, index)
+
+        self.counts[index] = count
+
+    def changed(self, row, col):
+        """
+        Updates the buckets after the given cell was filled or emptied.
+        """
+        index = row * self.sudoku.size + col
+
+        self.update(index)
+
+        counts = self.counts
+
+        for peer in self.peers[index]:
+            if counts[peer] is not None:
+                self.update(peer)
+
+    def best(self):
+        """
+        Returns an empty cell with the fewest candidates or None if the board is full.
+        Ties go to the first cell in row-major order, like the sorted greedy order.
+        """
+        for bucket, heap in zip(self.buckets, self.heaps):
+            if bucket:
+                while heap[0] not in bucket:
+                    heappop(heap)
+
+                return divmod(heap[0], self.sudoku.size)
+
+        return None
+
+def compact_cells(values, size: int) -> bytearray | array:
+    """
+    Copies flat cell values into a bytearray, or an array('H') if the numbers do not fit a byte.
+    """
+    values = list(values)
+
+    if size < 256 and max(values, default=0) < 256:
+        return bytearray(values)
+
+    return array("H", values)
+
+def generate_grid(size: int, rng: Random | None = None) -> list[int]:
+    """
+    Builds a random complete grid as flat cell values in O(size^2) without any search.
+    Starts from the pattern (grid_width * (row % grid_height) + row // grid_height + col) % size,
+    which is valid for any box shape, and shuffles rows within bands, bands,
+    columns within stacks, stacks and the numbers themselves.
+    """
+    mix = rng.shuffle if rng is not None else shuffle
+
+    grid_width = get_closest_grid(size)
+    grid_height = size // grid_width
+
+    def order(groups, group_size):
+        bands = list(range(groups))
+        mix(bands)
+
+        lines = []
+
+        for band in bands:
+            inner = list(range(group_size))
+            mix(inner)
+            lines.extend(band * group_size + line for line in inner)
+
+        return lines
+
+    rows = order(grid_width, grid_height)
+    cols = order(grid_height, grid_width)
+
+    numbers = list(range(1, size + 1))
+    mix(numbers)
+
+    return [numbers[(grid_width * (row % grid_height) + row // grid_height + col) % size]
+            for row in rows for col in cols]
+
+def mask_to_numbers(mask: int) -> list[int]:
+    """
+    Converts a candidate bitmask into an ascending list of numbers.
+    """
+    numbers = []
+
+    while mask:
+        low = mask & -mask
+        numbers.append(low.bit_length())
+        mask ^= low
+
+    return numbers
+
 def get_closest_grid(size: int) -> int:
     """
     Gets the closest rectangle width to a square.
@@ -226,41 +834,71 @@ def sudoku_from_file(file_name: str) -> Sudoku:
 
     return Sudoku(board)
 
-def test_sudoku(sizes: list[int], iters: int, fill_chances: list[int]):
+DIGITS = bytes.maketrans(b".0123456789", bytes([0, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9]))
+CHARACTERS = bytes.maketrans(bytes(range(10)), b".123456789")
+
+def parse_line(line: bytes, separator: bytes = b",") -> bytearray | array:
     """
-    Tests the sudoku algorithms for the different sizes and fill_chances for iters times.
+    Parses one puzzle written on a single line into a flat cell store with 0 for empty cells.
+    Boards up to 9x9 use one character per cell, larger boards separate cells with separator.
+    Empty cells are written as . or 0.
     """
-    times = {}
+    line = line.strip()
+
+    if separator not in line:
+        cells = bytearray(line.translate(DIGITS))
 
-    for size in sizes:
-        sudoku = Sudoku(size)
-        times[size] = {}
+        if cells and max(cells) > 9:
+            raise ValueError(f"Invalid character in puzzle line: {line[:20]!r}")
+    else:
+        values = [int(value) if value.strip(b". ") else 0 for value in line.split(separator)]
+        cells = compact_cells(values, isqrt(len(values)))
 
-        for fill in fill_chances:
-            times[size][fill] = []
+    if isqrt(len(cells)) ** 2 != len(cells):
+        raise ValueError(f"Puzzle line has {len(cells)} cells, which is not a square number.")
 
-            for _ in range(iters):
-                print(size, fill, _)
-                sudoku.fill(fill)
-                board_keep = deepcopy(sudoku.board)
+    return cells
 
-                sudoku.generate_cell_order()
-                start = time.time()
-                sudoku.solve()
-                end = time.time()-start
+def format_line(cells, separator: str = ",") -> str:
+    """
+    Writes a flat cell store as a single puzzle line, the inverse of parse_line.
+    """
+    if len(cells) <= 81:
+        return bytes(cells).translate(CHARACTERS).decode("ascii")
 
-                times[size][fill].append(("backtracking", board_keep, end))
+    return separator.join(str(num) if num else "." for num in cells)
 
-                sudoku.board = deepcopy(board_keep)
+def load_puzzles(file_name: str, separator: str = ",") -> list:
+    """
+    Reads a whole file with one puzzle per line at once into a list of flat cell stores.
+    Empty lines and lines starting with # are skipped.
+    """
+    with open(file_name, "rb") as file:
+        data = file.read()
 
-                sudoku.generate_cell_order()
-                start = time.time()
-                sudoku.solve(greedy=True)
-                end = time.time()-start
+    separator = separator.encode()
 
-                times[size][fill].append(("greedy", board_keep, end))
+    return [parse_line(line, separator) for line in data.splitlines()
+            if line.strip() and not line.startswith(b"#")]
 
-    return times
+def iter_puzzles(file_name: str, separator: str = ","):
+    """
+    Lazily reads a file with one puzzle per line, yielding flat cell stores.
+    """
+    separator = separator.encode()
+
+    with open(file_name, "rb") as file:
+        for line in file:
+            if line.strip() and not line.startswith(b"#"):
+                yield parse_line(line, separator)
+
+def save_puzzles(file_name: str, puzzles, separator: str = ","):
+    """
+    Writes Sudoku objects or flat cell stores to a file, one puzzle per line.
+    """
+    with open(file_name, "w", encoding="utf-8") as file:
+        file.writelines(format_line(puzzle.cells if isinstance(puzzle, Sudoku) else puzzle,
+                                    separator) + "\n" for puzzle in puzzles)
 
 
 if __name__ == "__main__":
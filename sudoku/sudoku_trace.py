@@ -0,0 +1,191 @@
+"""
+Binary search traces for sudoku solves
+"""
+
+from __future__ import annotations
+from array import array
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from sudoku_cls import Sudoku
+    from sudoku_vis import SudokuVis
+
+MAGIC = b"SDKT"
+VERSION = 1
+
+
+def encode_varint(value, out: bytearray):
+    """
+    Appends a non negative integer to out as a LEB128 varint, 7 bits per byte.
+    """
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+
+    out.append(value)
+
+
+def decode_varints(data, start=0):
+    """
+    Yields every varint in data from position start on.
+    """
+    value = shift = 0
+
+    for index in range(start, len(data)):
+        byte = data[index]
+        value |= (byte & 0x7F) << shift
+
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+class TraceWriter:
+    """
+    Records the cell updates of a solve into a binary trace file, in place of a visualization.
+    The file starts with MAGIC, the version, the board size and the starting cells, followed by
+    one varint per event: cell index * (size + 1) + number, with number 0 for emptying a cell.
+    Events are buffered and written in blocks. Updates are also passed on to forward if given.
+    """
+    def __init__(self, file_name: str, sudoku: Sudoku, forward: SudokuVis | None = None,
+                 buffer_size=1 << 16):
+        self.size = sudoku.size
+        self.forward = forward
+        self.buffer_size = buffer_size
+
+        self.file = open(file_name, "wb")
+        self.buffer = bytearray(MAGIC)
+
+        encode_varint(VERSION, self.buffer)
+        encode_varint(self.size, self.buffer)
+
+        for num in sudoku.cells:
+            encode_varint(num, self.buffer)
+
+        self.events = 0
+
+    def update_cell(self, i, j, value):
+        """
+        Records a placed number, or an emptied cell if value is "".
+        """
+        code = (i * self.size + j) * (self.size + 1) + (value or 0)
+        buffer = self.buffer
+
+        if code < 0x80:
+            buffer.append(code)
+        else:
+            encode_varint(code, buffer)
+
+        self.events += 1
+
+        if len(buffer) >= self.buffer_size:
+            self.file.write(buffer)
+            buffer.clear()
+
+        if self.forward:
+            self.forward.update_cell(i, j, value)
+
+    def close(self):
+        """
+        Writes out the buffered events and closes the file.
+        """
+        if self.file.closed:
+            return
+
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class Trace:
+    """
+    A recorded trace loaded for replay.
+    Every keyframe_interval events the board is kept as a keyframe,
+    so the state at any position is rebuilt from the closest keyframe before it.
+    """
+    def __init__(self, size, cells, events, keyframe_interval=4096):
+        self.size = size
+        self.cells = bytes(cells) if size < 256 else array("H", cells)
+        self.events = events
+        self.keyframe_interval = keyframe_interval
+
+        self.keyframes = []
+
+        board = array("H", cells)
+
+        for position, code in enumerate(events):
+            if not position % keyframe_interval:
+                self.keyframes.append(board[:])
+
+            index, num = divmod(code, size + 1)
+            board[index] = num
+
+    def __len__(self):
+        return len(self.events)
+
+    def event(self, position):
+        """
+        Returns the cell index and number (0 for emptied) of the event at position.
+        """
+        return divmod(self.events[position], self.size + 1)
+
+    def state_at(self, position):
+        """
+        Returns the board cells after the first position events as an array.
+        """
+        position = max(0, min(position, len(self.events)))
+
+        if not self.keyframes:
+            return array("H", list(self.cells))
+
+        keyframe = min(position // self.keyframe_interval, len(self.keyframes) - 1)
+        board = self.keyframes[keyframe][:]
+
+        for code in self.events[keyframe * self.keyframe_interval:position]:
+            index, num = divmod(code, self.size + 1)
+            board[index] = num
+
+        return board
+
+    def changes(self, start, stop):
+        """
+        Returns the last number written to every cell changed by events start to stop
+        as a dict of cell index to number.
+        """
+        changed = {}
+
+        for code in self.events[start:stop]:
+            index, num = divmod(code, self.size + 1)
+            changed[index] = num
+
+        return changed
+
+
+def read_trace(file_name: str, keyframe_interval=4096) -> Trace:
+    """
+    Loads a trace written by TraceWriter.
+    """
+    with open(file_name, "rb") as file:
+        data = file.read()
+
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{file_name} is not a sudoku trace file.")
+
+    values = decode_varints(data, len(MAGIC))
+
+    version = next(values, None)
+
+    if version != VERSION:
+        raise ValueError(f"Unsupported trace version: {version}")
+
+    size = next(values)
+    cells = [next(values) for _ in range(size * size)]
+
+    return Trace(size, cells, array("L", values), keyframe_interval)
@@ -2,15 +2,136 @@
 Sudoku visualization 
 """
 
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk
-from time import sleep
 from math import log10, ceil
-from sudoku_cls import Sudoku, get_closest_grid
+from sudoku_cls import Sudoku, SudokuSearch, get_closest_grid, compact_cells
+from sudoku_trace import Trace
+
+FRAME_RATE = 30
+CANCEL = "cancel"
 
 class UserAbortedError(Exception):
     """Error for exiting out of sudoku visualization."""
 
+class SolverThread(threading.Thread):
+    """
+    Runs a sudoku search off the Tk thread.
+    Every cell change is put on the updates queue as a (row, col, value) delta and None
+    is put there once the search ends. Putting CANCEL on the commands queue stops the search
+    between slices of slice_nodes nodes, or right away while it is waiting out the delay.
+    Given the previous solution, the board is first repaired from it (see Sudoku.reuse_solution)
+    within repair_nodes nodes before it is searched from scratch.
+    """
+    def __init__(self, sudoku: Sudoku, greedy=False, visualize=True, delay=0.0, slice_nodes=1000,
+                 previous=None, repair_nodes=10000):
+        super().__init__(daemon=True)
+
+        self.sudoku = sudoku
+        self.greedy = greedy
+        self.visualization = self if visualize else None
+        self.slice_nodes = slice_nodes
+
+        self.previous = previous
+        self.repair_nodes = repair_nodes
+        self.repaired = False
+
+        self.updates = queue.Queue()
+        self.commands = queue.Queue()
+
+        self.delay = delay
+        self.cancelled = False
+        self.result = None
+
+    def run(self):
+        if self.previous is not None:
+            self.repaired = self.repair()
+
+        if self.repaired:
+            self.result = True
+        else:
+            self.result = self.search(SudokuSearch(self.sudoku, greedy=self.greedy,
+                                                   visualization=self.visualization))
+
+        self.updates.put(None)
+
+    def search(self, search: SudokuSearch, max_nodes=None):
+        """
+        Runs a search slice by slice until it ends, is cancelled or has used up max_nodes nodes.
+        Returns the search result, None if it did not finish.
+        """
+        result = None
+        start = self.sudoku.nodes
+
+        while result is None and not self.poll():
+            budget = self.slice_nodes
+
+            if max_nodes is not None:
+                budget = min(budget, start + max_nodes - self.sudoku.nodes)
+
+                if budget <= 0:
+                    break
+
+            result = search.step(budget)
+
+        return result
+
+    def repair(self):
+        """
+        Fills the board from the previous solution and searches only the cells around
+        the changed givens. If that fails the board is put back to its givens.
+        Returns True if the board was solved.
+        """
+        sudoku = self.sudoku
+        givens = compact_cells(sudoku.cells, sudoku.size)
+
+        if sudoku.reuse_solution(self.previous) is None:
+            return False
+
+        if self.visualization:
+            for index, num in enumerate(sudoku.cells):
+                if not givens[index]:
+                    self.update_cell(*divmod(index, sudoku.size), num or "")
+
+        search = SudokuSearch(sudoku, greedy=True, visualization=self.visualization)
+
+        if self.search(search, self.repair_nodes):
+            return True
+
+        for index, num in enumerate(givens):
+            if sudoku.cells[index] != num and self.visualization:
+                self.updates.put((*divmod(index, sudoku.size), ""))
+
+        sudoku.board = givens
+
+        return False
+
+    def poll(self, timeout=0.0):
+        """
+        Reads the commands queue, waiting up to timeout seconds for one.
+        Returns True if the search was cancelled.
+        """
+        try:
+            command = self.commands.get(timeout=timeout) if timeout else self.commands.get_nowait()
+        except queue.Empty:
+            return self.cancelled
+
+        if command == CANCEL:
+            self.cancelled = True
+
+        return self.cancelled
+
+    def update_cell(self, i, j, value):
+        """
+        Called by the search for every placed or removed number.
+        """
+        self.updates.put((i, j, value))
+
+        if self.delay and not self.cancelled:
+            self.poll(self.delay)
+
 class SudokuVis:
     """
     Sudoku visualization class.
@@ -34,7 +155,7 @@ class SudokuVis:
 
         if isinstance(board, Sudoku):
             self.grid_width = board.grid_width
-            self.grid_height = board.grid_width
+            self.grid_height = board.grid_height
             self.size = board.size
 
             board = board.board
@@ -91,7 +212,8 @@ class SudokuVis:
         self.sleep_slider_label = ttk.Label(self.master, text="Delay (seconds)")
         self.sleep_slider_label.grid(row=self.size+2, column=0, columnspan=self.size, sticky="we")
 
-        self.sleep_slider = tk.Scale(master, from_=0.0, to=1.0, resolution=0.001, orient=tk.HORIZONTAL)
+        self.sleep_slider = tk.Scale(master, from_=0.0, to=1.0, resolution=0.001, orient=tk.HORIZONTAL,
+                                     command=self.set_delay)
         self.sleep_slider.grid(row=self.size+3, column=0, columnspan=self.size, sticky="we")
 
         self.visualize_solve_button = tk.Button(master, text="Visualization: ON", command=self.toggle_visualize)
@@ -111,6 +233,13 @@ class SudokuVis:
         self.solving = False
         self.sudoku = None
 
+        self.solver = None
+        self.cancelling = False
+        self.last_solution = None
+
+        self.trace = None
+        self.playing = False
+
     def build_grid(self):
         """
         Builds the entries grid of tkinter entry components for displaying a sudoku board.
@@ -160,15 +289,18 @@ class SudokuVis:
 
             self.entries[i][j].delete(0, tk.END)
             self.entries[i][j].insert(0, new_num)
+            self.entries[i][j].configure(style="PreSolved.TEntry")
 
         return "break"
 
-    def read_board(self):
+    def read_board(self, givens_only=False):
         """
         Constructs a board from the entries list.
+        With givens_only, numbers placed by the last solve are left out.
         """
-        return [[int(self.entries[j][i].get() or 0) or None for i in range(self.size)]
-                                                            for j in range(self.size)]
+        return [[int(self.entries[j][i].get() or 0) or None
+                 if not givens_only or self.entries[j][i].cget("style") == "PreSolved.TEntry"
+                 else None for i in range(self.size)] for j in range(self.size)]
     def write_board(self, board):
         """
         Constructs a board from the entries list.
@@ -183,26 +315,78 @@ class SudokuVis:
         """
         Method for updating cell values during solving.
         """
-        sleep_amount = self.sleep_slider.get()
-        if sleep_amount:
-            sleep(sleep_amount)
-
         cell = self.entries[i][j]
 
         cell.delete(0, tk.END)
         if value != "":
             cell.insert(0, str(value))
 
-        self.master.update()
+    def set_delay(self, value):
+        """
+        Passes a new delay from the slider on to a running solver.
+        """
+        if self.solver is not None:
+            self.solver.delay = float(value)
+
+    def draw_frame(self):
+        """
+        Applies the solver updates queued since the last frame and schedules the next one.
+        Only the last value of every cell is drawn, so when the solver is faster than
+        the display the intermediate states are skipped.
+        """
+        solver = self.solver
+        changes = {}
+        finished = False
+
+        for _ in range(solver.updates.qsize()):
+            delta = solver.updates.get_nowait()
+
+            if delta is None:
+                finished = True
+                break
+
+            i, j, value = delta
+            changes[i, j] = value
+
+        if not self.cancelling:
+            for (i, j), value in changes.items():
+                self.update_cell(i, j, value)
+
+        if finished:
+            self.finish_solve()
+        else:
+            self.master.after(1000 // FRAME_RATE, self.draw_frame)
+
+    def finish_solve(self):
+        """
+        Shows the result of a finished solver thread.
+        """
+        if not self.cancelling and self.solver.result:
+            self.last_solution = compact_cells(self.sudoku.cells, self.size)
+
+            if not self.visualize:
+                self.write_board(self.sudoku.board)
+
+        self.solver = None
+        self.solving = False
+        self.cancelling = False
+
+    def cancel_solve(self):
+        """
+        Asks a running solver thread to stop, its remaining updates are dropped.
+        """
+        if self.solver is not None:
+            self.solver.commands.put(CANCEL)
+            self.cancelling = True
 
     def solve(self, greedy=False):
         """
         Converts the entires 2D list into an int 2D list and Solves it using the Sudoku class.
         """
-        if self.solving:
+        if self.solving or self.playing:
             return
 
-        board = self.read_board()
+        board = self.read_board(givens_only=self.last_solution is not None)
 
         self.sudoku = Sudoku(board)
 
@@ -212,7 +396,7 @@ class SudokuVis:
         if self.sudoku.is_board_valid():
             for i in range(self.size):
                 for j in range(self.size):
-                    if self.entries[i][j].get():
+                    if board[i][j]:
                         self.entries[i][j].configure(style="PreSolved.TEntry")
                     else:
                         self.entries[i][j].configure(style="Cell.TEntry")
@@ -221,19 +405,11 @@ class SudokuVis:
 
             self.sudoku.generate_cell_order()
 
-            if self.visualize:
-                try:
-                    self.sudoku.solve(visualization=self, greedy=greedy)
-                except StopIteration:
-                    self.clear_placed()
-            else:
-                try:
-                    self.sudoku.solve(greedy=greedy)
-                    self.write_board(self.sudoku.board)
-                except StopIteration:
-                    self.clear_placed()
+            self.solver = SolverThread(self.sudoku, greedy=greedy, visualize=self.visualize,
+                                       delay=self.sleep_slider.get(), previous=self.last_solution)
+            self.solver.start()
 
-            self.solving = False
+            self.draw_frame()
 
         else:
             print("Invalid Board.")
@@ -245,7 +421,8 @@ class SudokuVis:
         if self.sudoku is None:
             return
 
-        self.sudoku.stop_solve = True
+        self.cancel_solve()
+        self.last_solution = None
 
         for i in range(self.size):
             for j in range(self.size):
@@ -258,7 +435,7 @@ class SudokuVis:
         if self.sudoku is None:
             return
 
-        self.sudoku.stop_solve = True
+        self.cancel_solve()
 
         for i in range(self.size):
             for j in range(self.size):
@@ -281,16 +458,108 @@ class SudokuVis:
             for j in range(self.size):
                 self.entries[i][j].configure(style="Cell.TEntry")
 
+        self.last_solution = None
+
         sudoku = Sudoku(self.size)
 
         sudoku.fill(self.fill_slider.get())
 
         self.write_board(sudoku.board)
 
-def init_visualization(board):
+    def load_trace(self, trace: Trace):
+        """
+        Adds controls for replaying a recorded trace: a slider for seeking to any event,
+        a speed slider in events per second and a play button.
+        """
+        self.trace = trace
+        self.position = 0
+        self.carry = 0.0
+        self.shown = list(trace.state_at(0))
+
+        self.position_slider = tk.Scale(self.master, from_=0, to=len(trace), orient=tk.HORIZONTAL,
+                                        label="Event", command=self.seek)
+        self.position_slider.grid(row=self.size+8, column=0, columnspan=self.size, sticky="we")
+
+        self.speed_slider = tk.Scale(self.master, from_=1, to=10000, orient=tk.HORIZONTAL,
+                                     label="Events per second")
+        self.speed_slider.set(100)
+        self.speed_slider.grid(row=self.size+9, column=0, columnspan=self.size, sticky="we")
+
+        self.play_button = tk.Button(self.master, text="Play", command=self.toggle_replay)
+        self.play_button.grid(row=self.size+10, column=0, columnspan=self.size, sticky="we")
+
+    def show_cells(self, changes):
+        """
+        Draws the replayed numbers given as a dict of cell index to number, 0 for empty.
+        """
+        for index, num in changes.items():
+            if self.shown[index] != num:
+                self.shown[index] = num
+                self.update_cell(*divmod(index, self.size), num or "")
+
+    def seek(self, value):
+        """
+        Jumps the replay to the board after the given number of events.
+        """
+        position = int(float(value))
+
+        if position == self.position:
+            return
+
+        self.position = position
+        self.show_cells(dict(enumerate(self.trace.state_at(position))))
+
+    def toggle_replay(self):
+        """
+        Starts or pauses the replay, starting over if it is at the end.
+        """
+        if self.solving:
+            return
+
+        self.playing = not self.playing
+        self.play_button.config(text="Pause" if self.playing else "Play")
+
+        if self.playing:
+            if self.position >= len(self.trace):
+                self.seek(0)
+
+            self.carry = 0.0
+            self.replay_frame()
+
+    def replay_frame(self):
+        """
+        Draws the events that fall into one frame at the chosen speed and schedules the next.
+        Cells changed several times within a frame are only drawn once.
+        """
+        if not self.playing:
+            return
+
+        self.carry += self.speed_slider.get() / FRAME_RATE
+        count = int(self.carry)
+        self.carry -= count
+
+        stop = min(self.position + count, len(self.trace))
+
+        self.show_cells(self.trace.changes(self.position, stop))
+        self.position = stop
+        self.position_slider.set(stop)
+
+        if stop >= len(self.trace):
+            self.playing = False
+            self.play_button.config(text="Play")
+        else:
+            self.master.after(1000 // FRAME_RATE, self.replay_frame)
+
+def init_visualization(board, trace: Trace | None = None):
     root = tk.Tk()
     try:
+        if trace is not None:
+            board = Sudoku(trace.cells)
+
         app = SudokuVis(root, board)
+
+        if trace is not None:
+            app.load_trace(trace)
     except UserAbortedError:
         print("Exitting out of application.")
     else:
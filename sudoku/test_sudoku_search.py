@@ -0,0 +1,30 @@
+"""
+Regression tests for resuming SudokuSearch in slices
+"""
+
+import pytest
+from sudoku_cls import Sudoku, SudokuSearch, parse_line
+
+PUZZLES = [
+    b"53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79",
+    b"8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+]
+
+
+@pytest.mark.parametrize("line", PUZZLES)
+@pytest.mark.parametrize("greedy", [False, True])
+@pytest.mark.parametrize("max_nodes", [1, 7, 100])
+def test_sliced_search_matches_full_search(line, greedy, max_nodes):
+    full = Sudoku(parse_line(line))
+    assert SudokuSearch(full, greedy=greedy).step()
+
+    sliced = Sudoku(parse_line(line))
+    search = SudokuSearch(sliced, greedy=greedy)
+
+    result = None
+    while result is None:
+        result = search.step(max_nodes)
+
+    assert result
+    assert bytes(sliced.cells) == bytes(full.cells)
+    assert sliced.nodes == full.nodes
@@ -0,0 +1,138 @@
+"""
+Vectorized constraint propagation for many small sudokus at once
+"""
+
+from __future__ import annotations
+from functools import lru_cache
+from math import isqrt
+import numpy as np
+from sudoku_cls import Sudoku, compact_cells
+
+
+@lru_cache(maxsize=None)
+def unit_indices(size):
+    """
+    Returns the flat cell indices of every row, column and box as a (3*size, size) array,
+    and for every cell its three units and its position in each of them as (size^2, 3) arrays.
+    """
+    units = np.array([[row * size + col for row, col in unit]
+                      for _, _, unit in Sudoku(size).units], dtype=np.intp)
+
+    cell_units = np.zeros((size * size, 3), dtype=np.intp)
+    cell_positions = np.zeros((size * size, 3), dtype=np.intp)
+
+    for unit, cells in enumerate(units):
+        for position, cell in enumerate(cells):
+            cell_units[cell, unit // size] = unit
+            cell_positions[cell, unit // size] = position
+
+    return units, cell_units, cell_positions
+
+
+def load_candidates(puzzles, size):
+    """
+    Builds the (N, size^2, size) boolean candidate tensor of N puzzles given as flat cells
+    or lists of rows. Returns the tensor and a mask of puzzles with numbers out of range.
+    """
+    values = np.array([[num or 0 for row in puzzle for num in row] if isinstance(puzzle, list)
+                       else list(puzzle) for puzzle in puzzles], dtype=np.int64)
+
+    invalid = (values > size).any(axis=1)
+    values[values > size] = 0
+
+    digits = np.arange(1, size + 1)
+    candidates = (values[:, :, None] == digits) | (values[:, :, None] == 0)
+
+    return candidates, invalid
+
+
+def propagation_step(candidates, units, cell_units, cell_positions):
+    """
+    Eliminates the numbers of solved cells from their peers and fills hidden singles
+    in every puzzle at once. Returns the new candidates and a mask of contradicted puzzles.
+    """
+    counts = candidates.sum(axis=2)
+    singles = candidates & (counts == 1)[:, :, None]
+
+    fixed = singles[:, units].sum(axis=2)
+    blocked = (fixed > 0)[:, cell_units].any(axis=2)
+
+    reduced = candidates & (~blocked | singles)
+
+    in_units = reduced[:, units]
+    places = in_units.sum(axis=2)
+
+    hidden_in_units = in_units & (places == 1)[:, :, None, :]
+    hidden = hidden_in_units[:, cell_units, cell_positions].any(axis=2)
+    has_hidden = hidden.any(axis=2)
+
+    reduced = np.where(has_hidden[:, :, None], hidden, reduced)
+
+    failed = ((fixed > 1).any(axis=(1, 2)) | (places == 0).any(axis=(1, 2)) |
+              (reduced.sum(axis=2) == 0).any(axis=1) | (hidden.sum(axis=2) > 1).any(axis=1))
+
+    return reduced, failed
+
+
+def propagate_all(candidates):
+    """
+    Runs propagation on the candidate tensor in place until no puzzle changes any more.
+    Puzzles that settle or run into a contradiction drop out of the following rounds.
+    Returns the mask of contradicted puzzles.
+    """
+    size = candidates.shape[2]
+    units, cell_units, cell_positions = unit_indices(size)
+
+    failed = np.zeros(len(candidates), dtype=bool)
+    active = np.arange(len(candidates))
+
+    while active.size:
+        current = candidates[active]
+        reduced, contradicted = propagation_step(current, units, cell_units, cell_positions)
+
+        candidates[active] = reduced
+        failed[active] |= contradicted
+
+        changed = (reduced != current).any(axis=(1, 2)) & ~contradicted
+        active = active[changed]
+
+    return failed
+
+
+def solve_vectorized(puzzles, **options) -> list:
+    """
+    Solves a list of puzzles of one size (flat cells or lists of rows).
+    Naked and hidden singles are propagated for all puzzles at once, only the puzzles
+    left unsolved go through Sudoku.solve, with options passed on to it.
+    Returns the solved cells as bytes, or None, for every puzzle.
+    """
+    if not puzzles:
+        return []
+
+    first = puzzles[0]
+    size = len(first) if isinstance(first, list) else isqrt(len(first))
+
+    options.pop("engine", None)
+    options.setdefault("greedy", True)
+    options.setdefault("propagate", True)
+
+    candidates, invalid = load_candidates(puzzles, size)
+    failed = propagate_all(candidates) | invalid
+
+    counts = candidates.sum(axis=2)
+    values = np.where(counts == 1, candidates.argmax(axis=2) + 1, 0)
+    complete = (counts == 1).all(axis=1)
+
+    solutions = []
+
+    for puzzle, cells in enumerate(values):
+        if failed[puzzle]:
+            solutions.append(None)
+        elif complete[puzzle]:
+            solutions.append(bytes(compact_cells(cells.tolist(), size)))
+        else:
+            sudoku = Sudoku(compact_cells(cells.tolist(), size))
+            solved = sudoku.is_board_valid() and sudoku.solve(**options)
+            solutions.append(bytes(sudoku.cells) if solved else None)
+
+    return solutions